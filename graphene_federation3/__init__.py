@@ -1,6 +1,10 @@
+from .batching import batched, get_required_fields
+from .columnar import ColumnarBatch
 from .entity import key
 from .extend import extend, external, requires
+from .field_set import FieldSet
+from .instrumentation import EntityGroupStats, EntityResolutionHooks
 from .main import build_schema
-from .provides import provides
+from .provides import ProvidedFields, get_provided_fields, provides
 
 __version__ = "0.3.3"
@@ -0,0 +1,365 @@
+"""
+ASGI application serving a schema built with `build_schema` as a federation subgraph.
+
+    from graphene_federation3.asgi import create_app
+
+    app = create_app(schema)
+
+It executes the operations with the `EntitiesExecutor` (parsed documents cache and compiled `_entities` plans),
+encodes the responses with orjson when it is installed, compresses large responses with gzip, caches the
+`_service` SDL responses, adds the `ftv1` trace when the gateway asks for it and exposes health endpoints.
+
+GET requests can only execute query operations (mutations are only accepted in POST requests, which browsers
+can't send cross-origin with a JSON body without a preflight request).
+
+A POST body can also be a list of operations, executed concurrently with a shared context whose `EntityLoader`
+batches and caches the entities resolution across the operations of the batch.
+
+Automatic persisted queries are supported: an operation can send the `persistedQuery` extension with the sha256 hash
+of its query instead of the query, which is looked up in the `persisted_queries` store.
+"""
+import gzip
+import json
+from asyncio import gather
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+from graphene import Context, Schema
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    OperationDefinitionNode,
+    OperationType,
+    get_operation_ast,
+)
+
+from .document_cache import DocumentCache, get_query_hash
+from .executor import EntitiesExecutor
+from .graphql_compatibility import get_formatted_result
+from .loader import EntityLoader, set_entity_loader
+from .persisted_queries import (
+    PERSISTED_QUERY_NOT_FOUND_CODE,
+    InMemoryPersistedQueryStore,
+    PersistedQueryError,
+    PersistedQueryStore,
+    get_persisted_query_hash,
+    resolve_persisted_query,
+)
+from .tracing import FederatedTracingMiddleware, should_trace
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+JSON_CONTENT_TYPE = b"application/json"
+MAX_SERVICE_RESPONSES = 32
+
+
+def default_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def default_context(scope: Dict[str, Any], headers: Dict[str, str]) -> Context:
+    return Context(scope=scope, headers=headers)
+
+
+def is_service_operation(document: DocumentNode) -> bool:
+    """
+    Check whether the document only selects the `_service` field, whose response never changes.
+    """
+    operations = [
+        definition
+        for definition in document.definitions
+        if isinstance(definition, OperationDefinitionNode)
+    ]
+    return len(operations) == 1 and all(
+        isinstance(selection, FieldNode)
+        and selection.name.value == "_service"
+        and not selection.directives
+        and not operations[0].variable_definitions
+        for selection in operations[0].selection_set.selections
+    )
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Check whether an `Accept-Encoding` header accepts gzip, i.e. lists `gzip` (or else `*`) with a non zero q-value.
+    """
+    qualities: Dict[str, float] = {}
+    for coding in accept_encoding.split(","):
+        name, *params = coding.split(";")
+        quality = 1.0
+        for param in params:
+            param_name, _, value = param.partition("=")
+            if param_name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+class BadRequest(Exception):
+    status = 400
+    headers: List[Tuple[bytes, bytes]] = []
+
+
+class MethodNotAllowed(BadRequest):
+    status = 405
+    headers = [(b"allow", b"POST")]
+
+
+class SubgraphApp:
+    def __init__(
+        self,
+        schema: Schema,
+        path: str = "/graphql",
+        health_paths: Tuple[str, ...] = ("/health", "/ready"),
+        context: Callable[[Dict[str, Any], Dict[str, str]], Any] = default_context,
+        dumps: Callable[[Any], Union[bytes, str]] = default_dumps,
+        max_documents: int = 1024,
+        gzip_min_size: int = 1024,
+        gzip_level: int = 5,
+        tracing: bool = True,
+        batching: bool = True,
+        max_batch_size: int = 100,
+        persisted_queries: Union[bool, PersistedQueryStore] = True,
+    ):
+        self.schema = schema
+        self.path = path
+        self.health_paths = health_paths
+        self.context = context
+        self.dumps = dumps
+        self.gzip_min_size = gzip_min_size
+        self.gzip_level = gzip_level
+        self.tracing = tracing
+        self.batching = batching
+        self.max_batch_size = max_batch_size
+        self.documents = DocumentCache(schema, maxsize=max_documents)
+        self.executor = EntitiesExecutor(schema, documents=self.documents)
+        self.persisted_queries: Optional[PersistedQueryStore] = None
+        if persisted_queries is True:
+            self.persisted_queries = InMemoryPersistedQueryStore(maxsize=max_documents)
+        elif persisted_queries:
+            self.persisted_queries = persisted_queries
+        self._service_responses: Dict[str, bytes] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        if scope["path"] in self.health_paths:
+            await self.send_response(send, 200, b'{"status":"ok"}')
+            return
+        if scope["path"] != self.path:
+            await self.send_response(send, 404, b'{"errors":[{"message":"Not Found"}]}')
+            return
+
+        headers = {
+            key.decode("latin-1").lower(): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        extra_headers: List[Tuple[bytes, bytes]] = []
+        try:
+            params = await self.get_params(scope, receive, headers)
+            status, body = await self.handle(scope, headers, params)
+        except BadRequest as e:
+            status, body = e.status, self.encode({"errors": [{"message": str(e)}]})
+            extra_headers = e.headers
+
+        await self.send_response(
+            send,
+            status,
+            body,
+            accept_encoding=headers.get("accept-encoding", ""),
+            extra_headers=extra_headers,
+        )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def get_params(self, scope, receive, headers: Dict[str, str]) -> Any:
+        if scope["method"] == "GET":
+            params: Dict[str, Any] = dict(
+                parse_qsl(scope.get("query_string", b"").decode("latin-1"))
+            )
+            for name in ("variables", "extensions"):
+                if name in params:
+                    params[name] = self.loads(params[name])
+            return params
+
+        if scope["method"] != "POST":
+            raise BadRequest("Only GET and POST requests are supported")
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        return self.loads(body)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        try:
+            if orjson is not None:
+                return orjson.loads(data)
+            return json.loads(data)
+        except ValueError:
+            raise BadRequest("Invalid JSON body")
+
+    def encode(self, value: Any) -> bytes:
+        data = self.dumps(value)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return data
+
+    async def handle(
+        self, scope, headers: Dict[str, str], params: Any
+    ) -> Tuple[int, bytes]:
+        if not isinstance(params, list):
+            context = self.context(scope, headers)
+            return 200, await self.execute(scope, headers, params, context)
+
+        if not self.batching:
+            raise BadRequest("Batched operations are not supported")
+        if len(params) > self.max_batch_size:
+            raise BadRequest(f"Batches are limited to {self.max_batch_size} operations")
+
+        # The operations of a batch share their context, hence their entity loader
+        context = self.context(scope, headers)
+        set_entity_loader(context, EntityLoader())
+        responses = await gather(
+            *(
+                self.execute_batched(scope, headers, operation_params, context)
+                for operation_params in params
+            )
+        )
+        return 200, b"[" + b",".join(responses) + b"]"
+
+    async def execute_batched(
+        self, scope, headers: Dict[str, str], params: Any, context: Any
+    ) -> bytes:
+        try:
+            return await self.execute(scope, headers, params, context)
+        except BadRequest as e:
+            return self.encode({"errors": [{"message": str(e)}]})
+
+    async def execute(
+        self, scope, headers: Dict[str, str], params: Any, context: Any
+    ) -> bytes:
+        if not isinstance(params, dict):
+            raise BadRequest("The operation query is missing")
+
+        query_hash = None
+        query = params.get("query")
+        if self.persisted_queries is not None:
+            try:
+                query_hash = get_persisted_query_hash(params)
+                query = await resolve_persisted_query(self.persisted_queries, params)
+            except PersistedQueryError as e:
+                if e.code != PERSISTED_QUERY_NOT_FOUND_CODE:
+                    raise BadRequest(str(e))
+                return self.encode({"errors": [e.formatted]})
+        if not isinstance(query, str):
+            raise BadRequest("The operation query is missing")
+        variables = params.get("variables")
+        if variables is not None and not isinstance(variables, dict):
+            raise BadRequest("The operation variables must be an object")
+
+        if query_hash is None:
+            query_hash = get_query_hash(query)
+        operation_name = params.get("operationName")
+        if scope["method"] == "GET":
+            self.check_query_operation(query, query_hash, operation_name)
+
+        tracer = None
+        if self.tracing and should_trace(headers):
+            tracer = FederatedTracingMiddleware()
+        else:
+            # The cached responses are untraced
+            response = self._service_responses.get(query_hash)
+            if response is not None:
+                return response
+
+        result = await self.executor.execute(
+            query,
+            variables=variables,
+            operation_name=operation_name,
+            context_value=context,
+            middleware=[tracer] if tracer else None,
+            query_hash=query_hash,
+        )
+        if tracer is not None:
+            tracer.add_to_result(result)
+
+        response = self.encode(get_formatted_result(result))
+        if (
+            not result.errors
+            and tracer is None
+            and len(self._service_responses) < MAX_SERVICE_RESPONSES
+        ):
+            document, _ = self.documents.get(query, query_hash)
+            if is_service_operation(document):
+                self._service_responses[query_hash] = response
+        return response
+
+    def check_query_operation(
+        self, query: str, query_hash: str, operation_name: Optional[str]
+    ):
+        """
+        Reject the mutations (and subscriptions) sent in a GET request.
+        The invalid documents are left to the execution, which reports their errors.
+        """
+        document, errors = self.documents.get(query, query_hash)
+        if errors:
+            return
+        operation = get_operation_ast(document, operation_name)
+        if operation is not None and operation.operation != OperationType.QUERY:
+            raise MethodNotAllowed(
+                f"Can only perform a {operation.operation.value} operation"
+                " from a POST request"
+            )
+
+    async def send_response(
+        self,
+        send,
+        status: int,
+        body: bytes,
+        accept_encoding: str = "",
+        extra_headers: List[Tuple[bytes, bytes]] = (),
+    ):
+        headers: List[Tuple[bytes, bytes]] = [
+            (b"content-type", JSON_CONTENT_TYPE),
+            *extra_headers,
+        ]
+        if len(body) >= self.gzip_min_size and accepts_gzip(accept_encoding):
+            body = gzip.compress(body, compresslevel=self.gzip_level)
+            headers.append((b"content-encoding", b"gzip"))
+            headers.append((b"vary", b"Accept-Encoding"))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_app(schema: Schema, **kwargs) -> SubgraphApp:
+    """
+    Create the ASGI application serving the subgraph schema.
+    See `SubgraphApp` for the options.
+    """
+    return SubgraphApp(schema, **kwargs)
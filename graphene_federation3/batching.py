@@ -0,0 +1,228 @@
+"""
+Batched field resolution of the entities returned by an `_entities` call.
+
+After resolving the representations of an entity type, `resolve_entities` registers for each distinct entity
+- the values of its `@requires` fields sent by the gateway, parsed with their schema types (see `get_required_fields`)
+- the `EntityGroup` of all the entities of that type in the response, which lets a batched field resolver be called
+  once with all of them instead of once per entity.
+They are kept in an `EntityRegistry` stored in the context of the request (an object accepting attributes or a dict),
+never on the entities themselves which may be shared between requests (e.g. cached instances). Without a context,
+the batched field resolvers are called once per entity and the `@requires` values aren't available.
+
+Field resolvers are batched with the `batched` decorator, or `requires(..., batched=True)`.
+"""
+from asyncio import ensure_future
+from inspect import isawaitable
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from graphene import Schema
+from graphql import GraphQLObjectType, GraphQLResolveInfo, default_field_resolver
+
+from .field_set import FieldSet, iter_decorated_fields
+from .graphql_compatibility import get_type_map_from_schema
+
+ENTITY_REGISTRY_ATTRIBUTE = "entity_registry"
+
+
+class EntityRegistry:
+    """
+    The `EntityGroup`s and `@requires` values of the entities resolved by the `_entities` calls of a request,
+    by entity id (the groups keep their entities alive for the request).
+    """
+
+    __slots__ = ("groups", "required_fields")
+
+    def __init__(self):
+        self.groups: Dict[int, "EntityGroup"] = {}
+        self.required_fields: Dict[int, Mapping[str, Any]] = {}
+
+
+def get_entity_registry(context: Any, create: bool = False) -> Optional[EntityRegistry]:
+    """
+    Return the `EntityRegistry` of the request context, creating it if `create` is set (unless the context can't
+    hold it).
+    """
+    if isinstance(context, dict):
+        registry = context.get(ENTITY_REGISTRY_ATTRIBUTE)
+    else:
+        registry = getattr(context, ENTITY_REGISTRY_ATTRIBUTE, None)
+    if registry is None and create and context is not None:
+        registry = EntityRegistry()
+        try:
+            if isinstance(context, dict):
+                context[ENTITY_REGISTRY_ATTRIBUTE] = registry
+            else:
+                setattr(context, ENTITY_REGISTRY_ATTRIBUTE, registry)
+        except (AttributeError, TypeError):
+            return None
+    return registry
+
+
+def get_required_fields(entity: Any, info: GraphQLResolveInfo) -> Mapping[str, Any]:
+    """
+    Return the `@requires` fields values of an entity resolved by `_entities` in the request, by graphene_type
+    attribute name.
+    """
+    registry = get_entity_registry(info.context)
+    if registry is None:
+        return {}
+    return registry.required_fields.get(id(entity)) or {}
+
+
+class EntityGroup:
+    """
+    The distinct entities of a type returned by one `_entities` call, sharing the results of the batched resolvers.
+    """
+
+    __slots__ = ("entities", "index", "results")
+
+    def __init__(self):
+        self.entities: List[Any] = []
+        self.index: Dict[int, int] = {}
+        self.results: Dict[Tuple[str, str], Any] = {}
+
+    def add(self, entity: Any) -> bool:
+        if id(entity) in self.index:
+            return False
+        self.index[id(entity)] = len(self.entities)
+        self.entities.append(entity)
+        return True
+
+    def resolve(
+        self,
+        resolver: Callable,
+        root: Any,
+        info: GraphQLResolveInfo,
+        args: Dict[str, Any],
+    ) -> Any:
+        """
+        Return the value of the field for the given entity, calling the batched resolver with all the entities of the
+        group the first time the field (with those arguments) is resolved.
+        """
+        cache_key = (info.field_name, repr(sorted(args.items())))
+        if cache_key in self.results:
+            result = self.results[cache_key]
+        else:
+            try:
+                result = resolver(self.entities, info, **args)
+            except Exception as e:
+                result = e
+            if isawaitable(result):
+                result = ensure_future(result)
+            self.results[cache_key] = result
+
+        position = self.index[id(root)]
+        if isawaitable(result):
+            return get_awaited_value(result, position)
+        return get_value(result, position)
+
+
+def get_value(result: Any, position: int) -> Any:
+    if isinstance(result, Exception):
+        raise result
+    return result[position]
+
+
+async def get_awaited_value(result: Any, position: int) -> Any:
+    return (await result)[position]
+
+
+def batched(resolver: Callable) -> Callable:
+    """
+    Mark a field resolver of an entity type as batched: for the entities returned by `_entities` it is called once
+    with the list of all the entities of the type in the response, and must return the list of their values
+    (or an awaitable of it).
+
+        @key("id")
+        class User(ObjectType):
+            id = ID(required=True)
+            reviews = List(Review)
+
+            @batched
+            def resolve_reviews(users, info):
+                reviews = get_reviews_by_user_ids([user.id for user in users])
+                return [reviews.get(user.id, []) for user in users]
+    """
+    resolver._batched = True
+    return resolver
+
+
+def get_batched_resolver(resolver: Callable) -> Callable:
+    """
+    Wrap a batched field resolver, called with the list of the entities instead of a single one and returning the
+    list of their values.
+    Outside of an `_entities` response (or without request context) it is called with a list of one entity.
+    """
+
+    def resolve(root, info, **args):
+        registry = get_entity_registry(info.context)
+        group = registry.groups.get(id(root)) if registry is not None else None
+        if group is not None:
+            return group.resolve(resolver, root, info, args)
+
+        result = resolver([root], info, **args)
+        if isawaitable(result):
+            return get_awaited_value(result, 0)
+        return result[0]
+
+    resolve._batched_resolver = resolver
+    return resolve
+
+
+def get_batched_fields(schema: Schema) -> Dict[str, List[str]]:
+    """
+    Find the fields marked as batched, by type name.
+    """
+    batched_fields: Dict[str, List[str]] = {}
+    for type_name, type_ in get_type_map_from_schema(schema).items():
+        graphene_type = getattr(type_, "graphene_type", None)
+        if (
+            not isinstance(type_, GraphQLObjectType)
+            or graphene_type is None
+            or not hasattr(graphene_type._meta, "fields")
+        ):
+            continue
+        for field_name, field, graphene_field in iter_decorated_fields(schema, type_):
+            if getattr(graphene_field, "_batched", False) or getattr(
+                field.resolve, "_batched", False
+            ):
+                batched_fields.setdefault(type_name, []).append(field_name)
+    return batched_fields
+
+
+def set_batched_resolvers(schema: Schema):
+    """
+    Wrap the resolvers of the batched fields of the schema with `get_batched_resolver`.
+    """
+    type_map = get_type_map_from_schema(schema)
+    for type_name, field_names in get_batched_fields(schema).items():
+        for field_name in field_names:
+            field = type_map[type_name].fields[field_name]
+            if not hasattr(field.resolve, "_batched_resolver"):
+                field.resolve = get_batched_resolver(
+                    field.resolve or default_field_resolver
+                )
+
+
+def attach_entity_group(
+    info: GraphQLResolveInfo,
+    resolved: Iterable[Tuple[dict, Any]],
+    required: Optional[FieldSet],
+) -> Optional[EntityGroup]:
+    """
+    Register the `@requires` fields values and the shared `EntityGroup` of the resolved entities of a type, given
+    with their representation, in the `EntityRegistry` of the request.
+    """
+    registry = get_entity_registry(info.context, create=True)
+    if registry is None:
+        return None
+    group = EntityGroup()
+    for representation, entity in resolved:
+        if entity is None or not group.add(entity):
+            continue
+        registry.groups[id(entity)] = group
+        if required is not None:
+            registry.required_fields[id(entity)] = required.parse_representation(
+                representation
+            )
+    return group
@@ -0,0 +1,122 @@
+"""
+Columnar results of the bulk entity resolvers.
+
+`__resolve_references` and `_resolve_reference_bulk` can return a `ColumnarBatch`, i.e. the entities as columns of
+values (lists, NumPy arrays, Arrow arrays...) rather than as one object per row.
+The representations are joined to the rows through a single index of the key column, and each resolved entity is a
+row view: a `__slots__` object holding the batch and its position, whose field values are read from the columns
+on access. Each column is converted to a list of python values once (`tolist` / `to_pylist`).
+"""
+from typing import Any, Dict, List, Mapping
+
+from .stub import get_type_namespace
+
+
+class ColumnarBatch:
+    """
+    Entities returned by a bulk resolver as a mapping of graphene attribute name to the sequence of its values:
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            frame = load_users(ids=values)
+            return ColumnarBatch({"id": frame["id"], "email": frame["email"]})
+
+    The missing columns read as `None`.
+    """
+
+    __slots__ = ("columns", "lists", "indexes")
+
+    def __init__(self, columns: Mapping[str, Any]):
+        if len({len(column) for column in columns.values()}) > 1:
+            raise ValueError("The columns of a batch must have the same length.")
+        self.columns = columns
+        self.lists: Dict[str, List[Any]] = {}
+        self.indexes: Dict[str, Dict[Any, int]] = {}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def column(self, name: str) -> List[Any]:
+        """
+        Return the values of a column as a list of python values (converted on the first call).
+        """
+        values = self.lists.get(name)
+        if values is None:
+            column = self.columns[name]
+            if hasattr(column, "to_pylist"):
+                values = column.to_pylist()
+            elif hasattr(column, "tolist"):
+                values = column.tolist()
+            else:
+                values = list(column)
+            self.lists[name] = values
+        return values
+
+    def index(self, name: str) -> Dict[Any, int]:
+        """
+        Return the positions of the rows by value of a (key) column.
+        """
+        index = self.indexes.get(name)
+        if index is None:
+            column = self.column(name)
+            index = self.indexes[name] = dict(zip(column, range(len(column))))
+        return index
+
+
+def get_row_view_cls(model) -> type:
+    """
+    Create the row view class of an entity type, sharing its class attributes (see `stub.get_type_namespace`).
+    Like the entity stubs, the views are resolved to their entity type by the `_Entity` union (`_entity_type`
+    attribute).
+    """
+    fields = tuple(model._meta.fields)
+    field_names = frozenset(fields)
+
+    def __init__(self, batch: ColumnarBatch, position: int):
+        self._batch = batch
+        self._position = position
+
+    def __getattr__(self, name):
+        # Only called for the fields (and the unset slots or unknown attributes)
+        if name not in field_names:
+            raise AttributeError(f"'{model.__name__}' object has no attribute '{name}'")
+        if name not in self._batch.columns:
+            return None
+        return self._batch.column(name)[self._position]
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in fields)
+        return f"{model.__name__}({values})"
+
+    namespace = {
+        **get_type_namespace(model),
+        "__slots__": ("_batch", "_position"),
+        "__init__": __init__,
+        "__getattr__": __getattr__,
+        "__repr__": __repr__,
+        "__module__": model.__module__,
+        "__qualname__": model.__qualname__,
+        "_entity_type": model,
+        "_meta": model._meta,
+    }
+    return type(model.__name__, (), namespace)
+
+
+def join_columnar_batch(
+    batch: ColumnarBatch,
+    view_cls: type,
+    key_attr: str,
+    values: List[Any],
+    keys: List[Any],
+) -> Dict[Any, Any]:
+    """
+    Return the row views of the batch by representation value, joining the `keys` (the native values of the
+    representation values) to the key column.
+    """
+    index = batch.index(key_attr)
+    views = {}
+    for value, k in zip(values, keys):
+        position = index.get(k)
+        if position is not None:
+            views[value] = view_cls(batch, position)
+    return views
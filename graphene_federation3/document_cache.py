@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from hashlib import sha256
+from inspect import isawaitable
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from graphene import Schema
+from graphql import (
+    DocumentNode,
+    ExecutionResult,
+    GraphQLError,
+    execute,
+    parse,
+    validate,
+)
+
+
+def get_query_hash(query: str) -> str:
+    return sha256(query.encode("utf-8")).hexdigest()
+
+
+class DocumentCache:
+    """
+    Bounded LRU cache of the parsed and validated documents of a schema, keyed by the sha256 of the query.
+
+    Gateways send the same query plans over and over, only the variables change: the parse and validation
+    cost is paid once per distinct query. The cached documents are shared between executions, which is safe as
+    the library never mutates the query AST.
+    Only valid documents are cached.
+    """
+
+    def __init__(self, schema: Schema, maxsize: int = 1024):
+        self.schema = schema
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._documents: "OrderedDict[str, DocumentNode]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def get(
+        self, query: str, query_hash: Optional[str] = None
+    ) -> Tuple[Optional[DocumentNode], List[GraphQLError]]:
+        """
+        Return the parsed document of the query and its syntax or validation errors.
+        """
+        if query_hash is None:
+            query_hash = get_query_hash(query)
+
+        with self._lock:
+            document = self._documents.get(query_hash)
+            if document is not None:
+                self._documents.move_to_end(query_hash)
+                self.hits += 1
+                return document, []
+
+        self.misses += 1
+        try:
+            document = parse(query)
+        except GraphQLError as error:
+            return None, [error]
+
+        errors = validate(self.schema.graphql_schema, document)
+        if errors:
+            return document, errors
+
+        with self._lock:
+            self._documents[query_hash] = document
+            if len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+
+        return document, []
+
+    async def execute(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None,
+        context_value: Any = None,
+        root_value: Any = None,
+        middleware: Optional[List[Any]] = None,
+        query_hash: Optional[str] = None,
+    ) -> ExecutionResult:
+        """
+        Execute the query against the schema, using the cached document when available.
+        """
+        document, errors = self.get(query, query_hash)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        result = execute(
+            self.schema.graphql_schema,
+            document,
+            root_value=root_value,
+            context_value=context_value,
+            variable_values=variables,
+            operation_name=operation_name,
+            middleware=middleware,
+        )
+        if isawaitable(result):
+            result = await result
+        return result
@@ -1,11 +1,25 @@
-from typing import Any, Dict
+from collections.abc import Mapping
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import graphene
 from graphene import Schema
-
-from .entity_query import BaseEntityQuery
+from graphene.utils.str_converters import to_camel_case
+
+from .batching import get_batched_fields
+from .columnar import get_row_view_cls
+from .entity_query import (
+    BaseEntityQuery,
+    get_entity_resolver,
+    get_lazy_loader,
+    is_sync_entity,
+)
+from .field_set import FieldSet, get_required_field_sets
 from .graphene_types import _Any
 from .graphql_compatibility import get_type_map_from_schema
+from .instrumentation import EntityResolutionHooks
+from .lazy import get_lazy_entity_cls
+from .stub import get_entity_stub_cls
 
 
 def get_entities(schema: Schema) -> Dict[str, Any]:
@@ -23,30 +37,137 @@ def get_entities(schema: Schema) -> Dict[str, Any]:
     return entities
 
 
+def get_row_types(entities: Dict[str, Any]) -> Dict[type, Any]:
+    """
+    Map the classes declared in the `possible_types` of the entity types (e.g. ORM models or dataclasses returned
+    by their resolvers) to the entity types.
+    """
+    row_types = {}
+    for entity in entities.values():
+        for row_type in getattr(entity._meta, "possible_types", ()):
+            row_types[row_type] = entity
+    return row_types
+
+
+def get_lazy_types(schema: Schema) -> List[str]:
+    """
+    Find the lazy entity types of the schema, see `lazy`.
+    """
+    return [
+        type_name
+        for type_name, model in get_entities(schema).items()
+        if get_lazy_loader(model) is not None
+    ]
+
+
 def get_entity_cls(entities: Dict[str, Any]):
     """
     Create _Entity type which is a union of all the entities types.
+
+    Besides the instances of the entity types, the resolved entities can be plain rows, resolved to their type
+    - by their class, declared in the `possible_types` of the type (`Meta`)
+    - by their `__typename` item for mappings
+    - by the `is_type_of` classmethod of the types otherwise (the default graphql resolution).
+    A single entity type is always resolved directly.
     """
+    row_types = get_row_types(entities)
+    single_type = next(iter(entities.values())) if len(entities) == 1 else None
 
     class _Entity(graphene.Union):
         class Meta:
             types = tuple(entities.values())
 
+        @classmethod
+        def resolve_type(cls, instance, info):
+            if single_type is not None:
+                return single_type
+            instance_type = type(instance)
+            # Declared rows and entity stubs (see `stub`)
+            entity_type = row_types.get(instance_type) or getattr(
+                instance_type, "_entity_type", None
+            )
+            if entity_type is not None:
+                return entity_type
+            if isinstance(instance, Mapping) and "__typename" in instance:
+                return entities.get(instance["__typename"])
+            return super().resolve_type(instance, info)
+
     return _Entity
 
 
-def get_entity_query(schema: Schema):
+def is_blocking_entity(model, default: bool = False) -> bool:
+    """
+    Check whether the entity type has a synchronous resolver marked (or by default) as blocking.
+    """
+    blocking = getattr(model, "_blocking", None)
+    if blocking is None:
+        blocking = default
+    # The lazy entities are loaded by their field resolvers
+    return (
+        blocking
+        and get_entity_resolver(model) is not None
+        and get_lazy_loader(model) is None
+        and is_sync_entity(model)
+    )
+
+
+def get_entity_query(
+    schema: Schema,
+    hooks: Iterable[EntityResolutionHooks] = (),
+    field_sets: Optional[Dict[str, Dict[Tuple[str, str], FieldSet]]] = None,
+    blocking: bool = False,
+    executor: Optional[Executor] = None,
+    stubs: bool = False,
+):
     """
     Create Entity query.
+    `blocking` is the default of the `@key(..., blocking=...)` option of the entity types: the synchronous
+    resolvers of the blocking types are run on `executor`.
+    `stubs` enables the entity stubs of the types without reference resolver, see `stub`.
     """
     entities_dict = get_entities(schema)
     if not entities_dict:
         return
 
+    requires = get_required_field_sets(field_sets) if field_sets else {}
+    grouped_types = frozenset(requires) | frozenset(get_batched_fields(schema))
+
+    blocking_types = frozenset(
+        type_name
+        for type_name, model in entities_dict.items()
+        if is_blocking_entity(model, blocking)
+    )
+
     entity_type = get_entity_cls(entities_dict)
 
     class EntityQuery(BaseEntityQuery):
         _schema = schema
+        _hooks = tuple(hooks)
+        _requires = requires
+        _grouped_types = grouped_types
+        # Blocking resolvers need an event loop to be run on the executor
+        _sync = not blocking_types and all(
+            is_sync_entity(model) for model in entities_dict.values()
+        )
+        _blocking_types = blocking_types
+        _executor = executor
+        _stubs = {
+            type_name: get_entity_stub_cls(model)
+            for type_name, model in entities_dict.items()
+            if stubs and get_entity_resolver(model) is None
+            # Types resolved by `is_type_of` can't be stubbed
+            and model.is_type_of is None and not model._meta.possible_types
+        }
+        _row_views = {
+            type_name: get_row_view_cls(model)
+            for type_name, model in entities_dict.items()
+            if get_entity_resolver(model) is not None
+        }
+        _lazy_entities = {
+            type_name: get_lazy_entity_cls(model)
+            for type_name, model in entities_dict.items()
+            if get_lazy_loader(model) is not None
+        }
         entities = graphene.List(
             entity_type, name="_entities", representations=graphene.List(_Any)
         )
@@ -54,13 +175,20 @@ def get_entity_query(schema: Schema):
     return EntityQuery
 
 
-def key(fields: str):
+def key(fields: str, cost: float = 1, blocking: Optional[bool] = None):
     """
     Take as input a field that should be used as key for that entity.
     See specification: https://www.apollographql.com/docs/federation/federation-spec/#key
 
     If the input contains a space it means it's a [compound primary key](https://www.apollographql.com/docs/federation/entities/#defining-a-compound-primary-key)
     which is not yet supported.
+
+    `cost` is the relative cost of resolving the entity by this key (e.g. higher for a non indexed column):
+    representations carrying several keys are resolved by their cheapest key.
+
+    `blocking=True` marks the (synchronous) entity resolvers of the type as blocking (e.g. using a blocking database
+    driver): they are run on a thread pool, see `build_schema`. It defaults to the `blocking_resolvers` option of
+    `build_schema`.
     """
     if " " in fields:
         raise NotImplementedError("Compound primary keys are not supported.")
@@ -75,6 +203,19 @@ def key(fields: str):
         keys.append(fields)
         setattr(Type, "_keys", keys)
 
+        if blocking is not None:
+            setattr(Type, "_blocking", blocking)
+
+        key_costs = getattr(Type, "_key_costs", {})
+        key_costs[fields] = cost
+        setattr(Type, "_key_costs", key_costs)
+        # The representation fields of the keys, cheapest first (in declaration order for equal costs)
+        setattr(
+            Type,
+            "_key_fields",
+            [to_camel_case(k) for k in sorted(keys, key=key_costs.__getitem__)],
+        )
+
         return Type
 
     return decorator
@@ -1,10 +1,34 @@
-import json
+from asyncio import gather, get_running_loop
 from collections import defaultdict
-from inspect import isawaitable
-from typing import List, Dict, Any
+from collections.abc import Mapping
+from concurrent.futures import Executor
+from contextvars import copy_context
+from copy import copy
+from functools import partial
+from inspect import (
+    isasyncgenfunction,
+    iscoroutinefunction,
+    isawaitable,
+    signature,
+    unwrap,
+)
+from operator import attrgetter, methodcaller
+from time import perf_counter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Generator,
+    List,
+    Optional,
+    Tuple,
+)
 
 import graphene
 from graphene import Schema
+from graphene.types.resolver import attr_resolver, dict_or_attr_resolver, dict_resolver
 from graphql import (
     ArgumentNode,
     FieldNode,
@@ -17,15 +41,26 @@ from graphql import (
     StringValueNode,
 )
 from graphql.pyutils import FrozenList, Path
-from graphql_relay import from_global_id, to_global_id
 
 from . import graphql_compatibility
+from .batching import attach_entity_group
+from .columnar import ColumnarBatch, join_columnar_batch
+from .field_set import FieldSet, get_selected_field_set
+from .instrumentation import EntityGroupStats, EntityResolutionHooks
+from .lazy import LazyLoad
+from .loader import get_entity_loader
 from .utils import (
+    decode_global_ids,
     field_name_to_type_attribute,
     get_data_for_id_filter_from_representations,
     get_model_key,
+    is_global_id_field,
 )
 
+DEFAULT_RESOLVERS = (attr_resolver, dict_resolver, dict_or_attr_resolver)
+
+_selection_resolvers: Dict[Any, bool] = {}
+
 
 def copy_resolve_info(
     info: GraphQLResolveInfo,
@@ -55,8 +90,310 @@ def copy_resolve_info(
     )
 
 
-def get_type_mapping(representations):
-    type_mapping = defaultdict(list)
+def get_model_resolver(model, name: str):
+    """
+    Return the `__<name>` (name mangled) or `_<name>` resolver defined on the model, if any.
+    """
+    return getattr(model, "_%s__%s" % (model.__name__, name), None) or getattr(
+        model, "_%s" % name, None
+    )
+
+
+def accepts_selection(resolver: Callable) -> bool:
+    """
+    Check whether an entity resolver declares a `selection` argument, to be passed the selected fields.
+    """
+    func = getattr(resolver, "__func__", resolver)
+    accepts = _selection_resolvers.get(func)
+    if accepts is None:
+        try:
+            accepts = "selection" in signature(func).parameters
+        except (TypeError, ValueError):
+            accepts = False
+        _selection_resolvers[func] = accepts
+    return accepts
+
+
+def get_entities_selection(info: GraphQLResolveInfo, schema_name: str) -> FieldSet:
+    """
+    Collect the fields of an entity type selected by the `_entities` field (in its `... on <Type>` fragments).
+    """
+    return get_selected_field_set(
+        info, info.schema.get_type(schema_name), info.field_nodes
+    )
+
+
+class RepresentationContext:
+    """
+    The context passed to `_resolve_reference_bulk`: the request context, with a `representation` attribute holding
+    the name of the resolved type (read by the legacy bulk resolvers).
+    The other attributes (and items) are read from and written to the request context.
+    """
+
+    __slots__ = ("context", "representation")
+
+    def __init__(self, context: Any, representation: str):
+        object.__setattr__(self, "context", context)
+        object.__setattr__(self, "representation", representation)
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+    def __setattr__(self, name, value):
+        if name == "representation":
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.context, name, value)
+
+    def __getitem__(self, key):
+        return self.context[key]
+
+    def __setitem__(self, key, value):
+        self.context[key] = value
+
+
+def get_bulk_resolve_info(
+    info: GraphQLResolveInfo, external_key: str, values: list
+) -> GraphQLResolveInfo:
+    """
+    Build the resolve info passed to `_resolve_reference_bulk`, with an `<external_key>_In` argument.
+    The field node is copied so the (possibly cached and shared) query document is never mutated.
+    """
+    argument = ArgumentNode(
+        name=NameNode(value=f"{external_key}_In"),
+        value=ListValueNode(values=[StringValueNode(value=r) for r in values]),
+    )
+    field_node = copy(info.field_nodes[0])
+    field_node.arguments = FrozenList([argument])
+
+    return copy_resolve_info(
+        info,
+        field_def=info.parent_type.fields[info.field_name],
+        field_nodes=[field_node, *info.field_nodes[1:]],
+        parent_type=info.parent_type,
+        path=info.path,
+    )
+
+
+def get_row_key_getter(attname: str, default_value: Any) -> Callable[[Any], Any]:
+    """
+    Create a method reading the key of the nodes, which can be graphene objects or plain rows (mappings, dataclasses,
+    named tuples, ORM models...).
+    The accessor is compiled once per node class: the `get` method of mappings, an `attrgetter` when the class
+    declares the attribute (dataclass or named tuple field), `getattr` with a default otherwise.
+    """
+    getters: Dict[type, Callable[[Any], Any]] = {}
+
+    def get_key(node):
+        getter = getters.get(node.__class__)
+        if getter is None:
+            getter = getters[node.__class__] = compile_key_getter(
+                node.__class__, attname, default_value
+            )
+        return getter(node)
+
+    return get_key
+
+
+def compile_key_getter(
+    node_type: type, attname: str, default_value: Any
+) -> Callable[[Any], Any]:
+    if issubclass(node_type, Mapping):
+        return methodcaller("get", attname, default_value)
+    if attname in getattr(node_type, "__dataclass_fields__", ()) or attname in getattr(
+        node_type, "_fields", ()
+    ):
+        return attrgetter(attname)
+    return lambda node: getattr(node, attname, default_value)
+
+
+def get_key_resolver(
+    info: GraphQLResolveInfo, type_: GraphQLObjectType, field_name: str
+) -> Callable[[Any], Any]:
+    """
+    Create a method extracting the key value from a resolved node.
+
+    When the key field uses graphene's default resolver the attribute (or dict item) is read directly, see
+    `get_row_key_getter`.
+    Otherwise the field resolver is called with a single resolve info shared by all the nodes,
+    in which case the returned value may be awaitable.
+    """
+    field = type_.fields[field_name]
+    resolve = field.resolve
+
+    if isinstance(resolve, partial) and resolve.func in DEFAULT_RESOLVERS:
+        attname, default_value = resolve.args
+
+        if resolve.func is attr_resolver:
+            return lambda node: getattr(node, attname, default_value)
+        if resolve.func is dict_resolver:
+            return lambda node: node.get(attname, default_value)
+        return get_row_key_getter(attname, default_value)
+
+    fake_info = copy_resolve_info(
+        info,
+        field_def=field,
+        field_nodes=info.field_nodes,
+        parent_type=type_,
+        path=Path(info.path, 1, None),
+    )
+    return lambda node: resolve(node, fake_info)
+
+
+def run_steps(steps: Generator[Awaitable, Any, Any]) -> Any:
+    """
+    Run a generator yielding the awaitables it depends on (and sent back their results): synchronously as long as it
+    doesn't yield any, then as a coroutine from its first awaitable.
+    """
+    try:
+        awaitable = steps.send(None)
+    except StopIteration as stop:
+        return stop.value
+    return continue_steps(steps, awaitable)
+
+
+async def continue_steps(steps: Generator[Awaitable, Any, Any], awaitable: Awaitable):
+    while True:
+        try:
+            value = await awaitable
+        except Exception as e:
+            try:
+                awaitable = steps.throw(e)
+            except StopIteration as stop:
+                return stop.value
+        else:
+            try:
+                awaitable = steps.send(value)
+            except StopIteration as stop:
+                return stop.value
+
+
+def iter_awaited(awaitable: Awaitable) -> Generator[Awaitable, Any, Any]:
+    return (yield awaitable)
+
+
+def iter_index_nodes(
+    result, get_key: Callable[[Any], Any]
+) -> Generator[Awaitable, Any, Dict[Any, Any]]:
+    """
+    Index the nodes returned by a bulk resolver by their key value.
+    The nodes can be given as a relay connection, an iterable or an async iterator (e.g. streaming
+    rows from a server-side cursor).
+    """
+    if hasattr(result, "edges"):
+        result = (edge.node for edge in result.edges)
+
+    nodes = {}
+
+    if hasattr(result, "__aiter__"):
+        # Indexed as they arrive
+        iterator = result.__aiter__()
+        while True:
+            try:
+                node = yield iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            k = get_key(node)
+
+            if isawaitable(k):
+                k = yield k
+
+            nodes[k] = node
+
+        return nodes
+
+    for node in result:
+        k = get_key(node)
+
+        if isawaitable(k):
+            k = yield k
+
+        nodes[k] = node
+
+    return nodes
+
+
+async def index_nodes(result, get_key: Callable[[Any], Any]) -> Dict[Any, Any]:
+    nodes = run_steps(iter_index_nodes(result, get_key))
+    if isawaitable(nodes):
+        nodes = await nodes
+    return nodes
+
+
+async def run_blocking(
+    executor: Optional[Executor], resolver: Callable, *args, **kwargs
+) -> Any:
+    """
+    Call a blocking entity resolver on `executor` (the default executor of the event loop if `None`) with the
+    current context variables.
+    """
+    loop = get_running_loop()
+    call = partial(resolver, *args, **kwargs)
+    return await loop.run_in_executor(executor, copy_context().run, call)
+
+
+def call_blocking_bulk(resolver: Callable, *args, **kwargs) -> Any:
+    """
+    Call a blocking bulk resolver (`__resolve_references` or `_resolve_reference_bulk`), evaluating a lazy
+    iterable result (e.g. a query set) in the thread too.
+    """
+    result = resolver(*args, **kwargs)
+    if not (
+        isinstance(result, (Mapping, list, tuple))
+        or isawaitable(result)
+        or hasattr(result, "edges")
+        or hasattr(result, "__aiter__")
+        or not hasattr(result, "__iter__")
+    ):
+        result = list(result)
+    return result
+
+
+def get_entity_resolver(model) -> Optional[Callable]:
+    """
+    Return the resolver used for the entity type: `__resolve_references`, `_resolve_reference_bulk`,
+    `__resolve_reference` or `__load_fields` (see `lazy`), if any.
+    """
+    return (
+        get_model_resolver(model, "resolve_references")
+        or getattr(model, "_resolve_reference_bulk", None)
+        or get_model_resolver(model, "resolve_reference")
+        or get_model_resolver(model, "load_fields")
+    )
+
+
+def get_lazy_loader(model) -> Optional[Callable]:
+    """
+    Return the `__load_fields` loader of a lazy entity type, i.e. without any other entity resolver.
+    """
+    resolver = get_entity_resolver(model)
+    if resolver is not None and resolver == get_model_resolver(model, "load_fields"):
+        return resolver
+    return None
+
+
+def is_sync_entity(model) -> bool:
+    """
+    Check whether the resolver of the entity type (if any) is a plain function, i.e. not a coroutine function.
+    """
+    resolver = get_entity_resolver(model)
+    if resolver is None:
+        return True
+    func = unwrap(getattr(resolver, "__func__", resolver))
+    return not (iscoroutinefunction(func) or isasyncgenfunction(func))
+
+
+def get_key_mapping(
+    schema: Schema, representations
+) -> Tuple[Dict[Tuple[str, str], List[dict]], List[Tuple[Tuple[str, str], Any, dict]]]:
+    """
+    Partition the representations by type name and key field, as a type with several `@key`s can be referenced
+    by any of them in the same `_entities` call.
+    Also return the partition, key value and representation of each representation, in order.
+    """
+    partitions: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+    references = []
+    models: Dict[str, Any] = {}
 
     for representation in representations:
         if isinstance(representation, ObjectValueNode):
@@ -65,108 +402,434 @@ def get_type_mapping(representations):
             }
 
         schema_name = representation["__typename"]
-        type_mapping[schema_name].append(representation)
+        model = models.get(schema_name)
+        if model is None:
+            model = models[schema_name] = graphql_compatibility.call_schema_get_type(
+                schema, schema_name
+            ).graphene_type
+        key_name = get_model_key(model, representation)
+        partitions[(schema_name, key_name)].append(representation)
+        references.append(
+            ((schema_name, key_name), representation[key_name], representation)
+        )
 
-    return type_mapping
+    return partitions, references
 
 
 class BaseEntityQuery:
     _schema: Schema
+    _hooks: Tuple[EntityResolutionHooks, ...] = ()
+    # The merged `@requires` field sets by type name
+    _requires: Dict[str, FieldSet] = {}
+    # The types whose entities get an `EntityGroup` (with `@requires` or batched fields)
+    _grouped_types: FrozenSet[str] = frozenset()
+    # Whether all the entity resolvers are synchronous
+    _sync: bool = False
+    # The types whose (synchronous) resolvers are blocking, run on `_executor`
+    _blocking_types: FrozenSet[str] = frozenset()
+    _executor: Optional[Executor] = None
+    # The stub classes instantiated for the types without reference resolver, see `stub`
+    _stubs: Dict[str, type] = {}
+    # The row view classes of the entities returned as a `ColumnarBatch`, see `columnar`
+    _row_views: Dict[str, type] = {}
+    # The proxy classes of the lazy entity types, see `lazy`
+    _lazy_entities: Dict[str, type] = {}
     entities: graphene.List
 
     @classmethod
-    async def resolve_entities(cls, obj, info: GraphQLResolveInfo, representations):
-        type_mapping = get_type_mapping(representations)
-        results_dict: Dict[str, Any] = {}
+    def resolve_entities(cls, obj, info: GraphQLResolveInfo, representations):
+        """
+        Resolve the `_entities` field.
+        When all the entity resolvers are synchronous (`_sync`, detected by `build_schema`) and no `EntityLoader`
+        is used, the (type, key) groups are resolved one after the other without any coroutine, so that the
+        schema can also be executed synchronously. Should a resolver return an awaitable anyway, the resolution
+        goes on asynchronously.
+        """
+        if cls._sync and get_entity_loader(info.context) is None:
+            return run_steps(cls.iter_entities(info, representations))
+        return cls.resolve_entities_async(info, representations)
 
-        for schema_name, rps in type_mapping.items():
-            type_ = graphql_compatibility.call_schema_get_type(cls._schema, schema_name)
-            model = type_.graphene_type
+    @classmethod
+    def iter_entities(
+        cls, info: GraphQLResolveInfo, representations
+    ) -> Generator[Awaitable, Any, List[Any]]:
+        partitions, references = get_key_mapping(cls._schema, representations)
+        results: Dict[Tuple[str, str], Dict[Any, Any]] = {}
 
-            bulk_resolver = getattr(model, "_resolve_reference_bulk", None)
-            if bulk_resolver:
-                external_key, values = get_data_for_id_filter_from_representations(
-                    model, rps
+        for (schema_name, key_name), rps in partitions.items():
+            type_ = graphql_compatibility.call_schema_get_type(cls._schema, schema_name)
+            results_dict = results[(schema_name, key_name)] = {}
+            steps = cls.iter_type_group(info, type_, rps, results_dict)
+            if cls._hooks:
+                steps = cls.iter_instrumented_type_group(
+                    steps, info, type_, rps, results_dict
                 )
+            yield from steps
 
-                argument = ArgumentNode(
-                    name=NameNode(value=f"{external_key}_In"),
-                    value=ListValueNode(
-                        values=[StringValueNode(value=r) for r in values]
-                    ),
-                )
+        return cls.get_entities(info, results, references)
 
-                info.field_nodes[0].arguments = FrozenList([argument])
-                setattr(info.context, "representation", model.__name__)
-                result = bulk_resolver(model, info)
-
-                if isawaitable(result):
-                    result = await result
-
-                for edge in result.edges:
-                    field = type_.fields[external_key]
-                    fake_info = copy_resolve_info(
-                        info,
-                        field_def=field,
-                        field_nodes=info.field_nodes,
-                        parent_type=type_,
-                        path=Path(info.path, 1, None),
-                    )
-                    k = field.resolve(edge.node, fake_info)
+    @classmethod
+    async def resolve_entities_async(cls, info: GraphQLResolveInfo, representations):
+        partitions, references = get_key_mapping(cls._schema, representations)
+        results: Dict[Tuple[str, str], Dict[Any, Any]] = {
+            partition: {} for partition in partitions
+        }
+
+        loader = get_entity_loader(info.context)
+        resolve_group = (
+            partial(loader.load, cls) if loader is not None else cls.resolve_type_group
+        )
+
+        # The (type, key) groups are resolved concurrently
+        groups = [
+            cls.resolve_key_group(
+                resolve_group, info, schema_name, rps, results[(schema_name, key_name)]
+            )
+            for (schema_name, key_name), rps in partitions.items()
+        ]
+        if len(groups) == 1:
+            await groups[0]
+        else:
+            for result in await gather(*groups, return_exceptions=True):
+                if isinstance(result, BaseException):
+                    raise result
+
+        return cls.get_entities(info, results, references)
 
-                    if isawaitable(k):
-                        k = await k
+    @classmethod
+    def get_entities(
+        cls,
+        info: GraphQLResolveInfo,
+        results: Dict[Tuple[str, str], Dict[Any, Any]],
+        references: List[Tuple[Tuple[str, str], Any, dict]],
+    ) -> List[Any]:
+        """
+        Return the resolved entities in the order of their representations.
+        """
+        entities = [results[partition].get(value) for partition, value, _ in references]
+
+        if cls._grouped_types:
+            grouped: Dict[str, List[Tuple[dict, Any]]] = defaultdict(list)
+            for ((schema_name, _), _, representation), entity in zip(
+                references, entities
+            ):
+                if schema_name in cls._grouped_types:
+                    grouped[schema_name].append((representation, entity))
+            for schema_name, resolved in grouped.items():
+                attach_entity_group(info, resolved, cls._requires.get(schema_name))
 
-                    results_dict[k] = edge.node
+        return entities
 
-            else:
-                for representation in rps:
-                    model_arguments = representation.copy()
-                    model_arguments.pop("__typename")
+    @classmethod
+    async def resolve_key_group(
+        cls,
+        resolve_group: Callable,
+        info: GraphQLResolveInfo,
+        schema_name: str,
+        rps: List[dict],
+        results_dict: Dict[Any, Any],
+    ):
+        type_ = graphql_compatibility.call_schema_get_type(cls._schema, schema_name)
+        if not cls._hooks:
+            await resolve_group(info, type_, rps, results_dict)
+        else:
+            await run_steps(
+                cls.iter_instrumented_type_group(
+                    iter_awaited(resolve_group(info, type_, rps, results_dict)),
+                    info,
+                    type_,
+                    rps,
+                    results_dict,
+                )
+            )
 
-                    if graphql_compatibility.is_schema_in_auto_camelcase(cls._schema):
-                        get_model_attr = field_name_to_type_attribute(
-                            cls._schema, model
-                        )
-                        model_arguments = {
-                            get_model_attr(k): v for k, v in model_arguments.items()
-                        }
+    @classmethod
+    def iter_instrumented_type_group(
+        cls,
+        steps: Generator[Awaitable, Any, Optional[str]],
+        info: GraphQLResolveInfo,
+        type_: GraphQLObjectType,
+        rps: List[dict],
+        results_dict: Dict[str, Any],
+    ) -> Generator[Awaitable, Any, Optional[str]]:
+        """
+        Run the resolution steps of a (type, key) group between the `on_group_start` and `on_group_end` hooks.
+        """
+        stats = EntityGroupStats(type_.graphene_type, rps)
+        for hooks in cls._hooks:
+            hooks.on_group_start(info, stats)
+
+        start = perf_counter()
+        try:
+            stats.strategy = yield from steps
+        except Exception as e:
+            stats.error = e
+            raise
+        else:
+            stats.misses = sum(results_dict.get(k) is None for k in stats.keys)
+        finally:
+            stats.duration = perf_counter() - start
+            for hooks in cls._hooks:
+                hooks.on_group_end(info, stats)
+        return stats.strategy
 
-                    global_id = None
+    @classmethod
+    def get_type_selection(
+        cls, infos: List[GraphQLResolveInfo], type_: GraphQLObjectType
+    ) -> Optional[FieldSet]:
+        """
+        Return the fields selected on an entity type by the given `_entities` fields (merged), if its resolver
+        declares a `selection` argument.
+        """
+        model = type_.graphene_type
+        resolver = get_entity_resolver(model)
+        if resolver is None or not (
+            accepts_selection(resolver) or get_lazy_loader(model) is not None
+        ):
+            return None
+
+        selection = None
+        for info in infos:
+            info_selection = get_entities_selection(info, type_.name)
+            selection = (
+                info_selection if selection is None else selection.merge(info_selection)
+            )
+        return selection
 
-                    for k, v in model_arguments.items():
-                        if isinstance(getattr(model, k, None), graphene.types.ID):
-                            global_id = from_global_id(v)
+    @classmethod
+    def get_native_keys(
+        cls, model, schema_name: str, external_key: str, values: List[Any]
+    ) -> Tuple[str, List[Any]]:
+        """
+        Return the attribute name of the key field and the native key values of the representation values
+        (decoded from their global id for `ID` keys).
+        """
+        key_attr = field_name_to_type_attribute(cls._schema, model)(external_key)
+        if is_global_id_field(model, key_attr):
+            return key_attr, decode_global_ids(schema_name, values)
+        return key_attr, values
 
-                            assert (
-                                global_id.type == schema_name
-                            ), f"Invalid global id type: {schema_name} != {global_id.type}"
+    @classmethod
+    async def resolve_type_group(
+        cls,
+        info: GraphQLResolveInfo,
+        type_: GraphQLObjectType,
+        rps: List[dict],
+        results_dict: Dict[str, Any],
+        selection: Optional[FieldSet] = None,
+    ) -> str:
+        """
+        Resolve the representations of a single entity type, using the same key field, into `results_dict`.
+        Return the name of the resolution strategy used. See `iter_type_group`.
+        """
+        strategy = run_steps(
+            cls.iter_type_group(info, type_, rps, results_dict, selection)
+        )
+        if isawaitable(strategy):
+            strategy = await strategy
+        return strategy
+
+    @classmethod
+    def iter_type_group(
+        cls,
+        info: GraphQLResolveInfo,
+        type_: GraphQLObjectType,
+        rps: List[dict],
+        results_dict: Dict[str, Any],
+        selection: Optional[FieldSet] = None,
+    ) -> Generator[Awaitable, Any, str]:
+        """
+        Resolve the representations of a single entity type, using the same key field, into `results_dict`.
+        Return the name of the resolution strategy used.
+        This generator yields the awaitables returned by the resolvers, see `run_steps`.
+
+        The resolver gets the fields selected on the type by the operation (a `FieldSet`) as `selection` argument
+        when it declares one. `selection` is computed from `info` unless it is given.
+        The resolvers of the `_blocking_types` are run on `_executor`, the `__resolve_reference` calls concurrently.
+        The lazy entity types resolve to proxies holding their key, see `lazy`.
+        """
+        schema_name = type_.name
+        model = type_.graphene_type
+        blocking = schema_name in cls._blocking_types
+
+        references_resolver = get_model_resolver(model, "resolve_references")
+        bulk_resolver = getattr(model, "_resolve_reference_bulk", None)
+        reference_resolver = get_model_resolver(model, "resolve_reference")
+        lazy_loader = get_lazy_loader(model)
+
+        if selection is None:
+            selection = cls.get_type_selection([info], type_)
+        kwargs = {"selection": selection} if selection is not None else {}
+
+        if references_resolver:
+            external_key, values = get_data_for_id_filter_from_representations(
+                model, rps
+            )
+            values = list(dict.fromkeys(values))
+            key_attr, keys = cls.get_native_keys(
+                model, schema_name, external_key, values
+            )
+
+            if blocking:
+                result = run_blocking(
+                    cls._executor,
+                    call_blocking_bulk,
+                    references_resolver,
+                    info,
+                    key_attr,
+                    keys,
+                    **kwargs,
+                )
+            else:
+                result = references_resolver(info, key_attr, keys, **kwargs)
+
+            if isawaitable(result):
+                result = yield result
+
+            if isinstance(result, ColumnarBatch):
+                results_dict.update(
+                    join_columnar_batch(
+                        result, cls._row_views[schema_name], key_attr, values, keys
+                    )
+                )
+            elif isinstance(result, Mapping):
+                for value, k in zip(values, keys):
+                    results_dict[value] = result.get(k)
+            else:
+                nodes = yield from iter_index_nodes(
+                    result, get_key_resolver(info, type_, external_key)
+                )
+                # The nodes are indexed by their native key, unless the key field resolves to the global id
+                for value, k in zip(values, keys):
+                    results_dict[value] = nodes.get(k, nodes.get(value))
+
+            return "references"
+
+        elif bulk_resolver:
+            external_key, values = get_data_for_id_filter_from_representations(
+                model, rps
+            )
+
+            # The types are resolved concurrently: each group gets its own `context.representation`
+            bulk_info = get_bulk_resolve_info(info, external_key, values)._replace(
+                context=RepresentationContext(info.context, model.__name__)
+            )
+            if blocking:
+                result = run_blocking(
+                    cls._executor,
+                    call_blocking_bulk,
+                    bulk_resolver,
+                    model,
+                    bulk_info,
+                    **kwargs,
+                )
+            else:
+                result = bulk_resolver(model, bulk_info, **kwargs)
 
-                            model_arguments[k] = json.loads(global_id.id)
+            if isawaitable(result):
+                result = yield result
 
-                    if not global_id:
-                        raise Exception("No global id")
+            if isinstance(result, ColumnarBatch):
+                values = list(dict.fromkeys(values))
+                key_attr, keys = cls.get_native_keys(
+                    model, schema_name, external_key, values
+                )
+                results_dict.update(
+                    join_columnar_batch(
+                        result, cls._row_views[schema_name], key_attr, values, keys
+                    )
+                )
+            elif isinstance(result, Mapping):
+                results_dict.update(result)
+            else:
+                results_dict.update(
+                    (
+                        yield from iter_index_nodes(
+                            result, get_key_resolver(info, type_, external_key)
+                        )
+                    )
+                )
 
-                    model_instance = model(**model_arguments)
-                    resolver = getattr(
-                        model, "_%s__resolve_reference" % model.__name__, None
-                    ) or getattr(model, "_resolve_reference", None)
-                    if resolver:
-                        model_instance = resolver(model_instance, info)
+            return "bulk"
+
+        elif lazy_loader:
+            external_key, values = get_data_for_id_filter_from_representations(
+                model, rps
+            )
+            values = list(dict.fromkeys(values))
+            key_attr, keys = cls.get_native_keys(
+                model, schema_name, external_key, values
+            )
+
+            # The fields selected on the type are loaded on first access
+            fields = [
+                attr for attr in selection.attributes.values() if attr != key_attr
+            ]
+            load = LazyLoad(lazy_loader, info, key_attr, fields)
+            entity_cls = cls._lazy_entities[schema_name]
+            for value, k in zip(values, keys):
+                results_dict[value] = load.add(entity_cls(**{key_attr: k}))
+
+            return "lazy"
+
+        else:
+            entity_cls = (
+                model if reference_resolver else cls._stubs.get(schema_name, model)
+            )
+            get_model_attr = field_name_to_type_attribute(cls._schema, model)
+            id_attrs = [
+                attr for attr in model._meta.fields if is_global_id_field(model, attr)
+            ]
+            values = []
+            arguments = []
+            for representation in rps:
+                model_arguments = {
+                    get_model_attr(k): v
+                    for k, v in representation.items()
+                    if k != "__typename"
+                }
+                if not any(k in id_attrs for k in model_arguments):
+                    raise Exception("No global id")
+                # Keyed like the partition of the representation, see `get_key_mapping`
+                values.append(representation[get_model_key(model, representation)])
+                arguments.append(model_arguments)
+
+            # The global ids are decoded by field, for the whole group
+            for attr in id_attrs:
+                positions = [i for i, args in enumerate(arguments) if attr in args]
+                if not positions:
+                    continue
+                keys = decode_global_ids(
+                    schema_name, [arguments[i][attr] for i in positions]
+                )
+                for i, k in zip(positions, keys):
+                    arguments[i][attr] = k
+
+            instances = [
+                (value, entity_cls(**args)) for value, args in zip(values, arguments)
+            ]
+
+            if reference_resolver and blocking:
+                resolved = yield gather(
+                    *(
+                        run_blocking(
+                            cls._executor, reference_resolver, instance, info, **kwargs
+                        )
+                        for _, instance in instances
+                    )
+                )
+                instances = [
+                    (value, instance)
+                    for (value, _), instance in zip(instances, resolved)
+                ]
 
-                        if isawaitable(model_instance):
-                            model_instance = await model_instance
+            for value, model_instance in instances:
+                if reference_resolver and not blocking:
+                    model_instance = reference_resolver(model_instance, info, **kwargs)
 
-                    results_dict[
-                        to_global_id(global_id.type, global_id.id)
-                    ] = model_instance
+                if isawaitable(model_instance):
+                    model_instance = yield model_instance
 
-        entities = []
-        for representation in representations:
-            model = graphql_compatibility.call_schema_get_type(
-                cls._schema, representation["__typename"]
-            ).graphene_type
-            key_name = get_model_key(model, representation)
-            entities.append(results_dict.get(representation[key_name]))
+                results_dict[value] = model_instance
 
-        return entities
+            return "reference"
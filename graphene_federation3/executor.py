@@ -0,0 +1,665 @@
+"""
+Ahead-of-time compiled execution of `_entities` operations.
+
+Gateway `_entities` queries are highly repetitive: the same inline fragments over a few entity types.
+The `EntitiesExecutor` compiles each distinct `_entities` operation once into a plan holding the field definitions,
+resolvers and serializers of every selected field, so later executions only run the resolvers and serializers,
+without graphql-core's field collection and type checks for every object.
+
+Operations which can't be compiled (other root fields, directives, middlewares) are executed by graphql-core.
+If anything goes wrong while completing the resolved entities (a resolver error, a `null` non-null field...),
+the entities are completed again by graphql-core, which reports the errors according to the specification.
+The values already resolved by the compiled completion (by source object and field node) are reused by graphql-core,
+so no field resolver is called twice.
+"""
+from asyncio import ensure_future, gather
+from collections import OrderedDict
+from collections.abc import Iterator
+from inspect import isawaitable, iscoroutine
+from json.encoder import encode_basestring_ascii
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from graphene import Schema
+from graphql import (
+    DocumentNode,
+    ExecutionResult,
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLAbstractType,
+    GraphQLError,
+    GraphQLField,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLResolveInfo,
+    GraphQLSchema,
+    InlineFragmentNode,
+    OperationType,
+    SelectionSetNode,
+    Undefined,
+    default_field_resolver,
+    get_nullable_type,
+    is_abstract_type,
+    is_leaf_type,
+    located_error,
+)
+from graphql.execution import ExecutionContext, MiddlewareManager
+from graphql.execution.execute import default_type_resolver
+from graphql.execution.values import get_argument_values
+from graphql.pyutils import Path
+from graphql.utilities import get_operation_ast
+
+from .document_cache import DocumentCache, get_query_hash
+from .graphql_compatibility import get_execution_errors
+
+ENTITIES_FIELD = "_entities"
+
+
+class NotCompilable(Exception):
+    pass
+
+
+class FallbackToGraphQL(Exception):
+    pass
+
+
+class LeafPlan:
+    __slots__ = ("serialize",)
+
+    def __init__(self, serialize):
+        self.serialize = serialize
+
+
+class ListPlan:
+    __slots__ = ("item_non_null", "item_plan")
+
+    def __init__(self, item_non_null: bool, item_plan):
+        self.item_non_null = item_non_null
+        self.item_plan = item_plan
+
+
+class FieldPlan:
+    __slots__ = (
+        "response_key",
+        "json_key",
+        "field_def",
+        "field_nodes",
+        "node_id",
+        "parent_type",
+        "resolve",
+        "non_null",
+        "value_plan",
+    )
+
+    def __init__(
+        self,
+        response_key: str,
+        field_def: Optional[GraphQLField],
+        field_nodes: List[FieldNode],
+        parent_type: GraphQLObjectType,
+    ):
+        self.response_key = response_key
+        self.json_key = encode_basestring_ascii(response_key) + ":"
+        # `field_def` is None for `__typename`
+        self.field_def = field_def
+        self.field_nodes = field_nodes
+        # Identifies the field for graphql-core, see `ResolvedValuesMiddleware`
+        self.node_id = id(field_nodes[0])
+        self.parent_type = parent_type
+        self.resolve = None
+        self.non_null = False
+        self.value_plan = None
+
+
+class ObjectPlan:
+    __slots__ = ("type_", "fields")
+
+    def __init__(self, type_: GraphQLObjectType, fields: List[FieldPlan]):
+        self.type_ = type_
+        self.fields = fields
+
+
+class AbstractPlan:
+    __slots__ = ("abstract_type", "type_plans")
+
+    def __init__(
+        self, abstract_type: GraphQLAbstractType, type_plans: Dict[str, ObjectPlan]
+    ):
+        self.abstract_type = abstract_type
+        self.type_plans = type_plans
+
+
+class PlanCompiler:
+    def __init__(self, schema: GraphQLSchema, document: DocumentNode):
+        self.schema = schema
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if not hasattr(definition, "operation")
+        }
+
+    def does_fragment_apply(self, type_condition, type_: GraphQLObjectType) -> bool:
+        if type_condition is None:
+            return True
+        condition_type = self.schema.get_type(type_condition.name.value)
+        if condition_type is type_:
+            return True
+        return is_abstract_type(condition_type) and self.schema.is_sub_type(
+            condition_type, type_
+        )
+
+    def collect_fields(
+        self,
+        type_: GraphQLObjectType,
+        selection_set: SelectionSetNode,
+        fields: Dict[str, List[FieldNode]],
+    ):
+        for selection in selection_set.selections:
+            if selection.directives:
+                raise NotCompilable("Directives are not supported")
+            if isinstance(selection, FieldNode):
+                response_key = (selection.alias or selection.name).value
+                fields.setdefault(response_key, []).append(selection)
+            elif isinstance(selection, InlineFragmentNode):
+                if self.does_fragment_apply(selection.type_condition, type_):
+                    self.collect_fields(type_, selection.selection_set, fields)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments[selection.name.value]
+                if fragment.directives:
+                    raise NotCompilable("Directives are not supported")
+                if self.does_fragment_apply(fragment.type_condition, type_):
+                    self.collect_fields(type_, fragment.selection_set, fields)
+
+    def compile_value(self, type_, field_nodes: List[FieldNode]):
+        if isinstance(type_, GraphQLNonNull):
+            raise NotCompilable("Nested non null types are not supported")
+        if isinstance(type_, GraphQLList):
+            item_type = type_.of_type
+            item_non_null = isinstance(item_type, GraphQLNonNull)
+            if item_non_null:
+                item_type = item_type.of_type
+            return ListPlan(item_non_null, self.compile_value(item_type, field_nodes))
+        if is_leaf_type(type_):
+            return LeafPlan(type_.serialize)
+        if is_abstract_type(type_):
+            return AbstractPlan(
+                type_,
+                {
+                    possible_type.name: self.compile_object(possible_type, field_nodes)
+                    for possible_type in self.schema.get_possible_types(type_)
+                },
+            )
+        return self.compile_object(type_, field_nodes)
+
+    def compile_object(
+        self, type_: GraphQLObjectType, field_nodes: List[FieldNode]
+    ) -> ObjectPlan:
+        fields: Dict[str, List[FieldNode]] = {}
+        for field_node in field_nodes:
+            if field_node.selection_set:
+                self.collect_fields(type_, field_node.selection_set, fields)
+
+        plans = []
+        for response_key, nodes in fields.items():
+            field_name = nodes[0].name.value
+            if field_name == "__typename":
+                plans.append(FieldPlan(response_key, None, nodes, type_))
+                continue
+
+            field_def = type_.fields[field_name]
+            plan = FieldPlan(response_key, field_def, nodes, type_)
+            return_type = field_def.type
+            if isinstance(return_type, GraphQLNonNull):
+                plan.non_null = True
+                return_type = return_type.of_type
+            plan.value_plan = self.compile_value(return_type, nodes)
+            plans.append(plan)
+
+        return ObjectPlan(type_, plans)
+
+
+class ExecutionState:
+    """
+    Per execution state: the resolve info and arguments of the fields, shared by all the objects,
+    the values returned by the resolvers by source id, with their source (kept alive so that its id isn't reused),
+    and the awaitable values waiting to be completed.
+    """
+
+    __slots__ = (
+        "exe_context",
+        "entities_path",
+        "entities_info",
+        "fields",
+        "resolved",
+        "pending",
+    )
+
+    def __init__(
+        self,
+        exe_context: ExecutionContext,
+        entities_path: Path,
+        entities_info: GraphQLResolveInfo,
+    ):
+        self.exe_context = exe_context
+        self.entities_path = entities_path
+        self.entities_info = entities_info
+        self.fields: Dict[int, Tuple[GraphQLResolveInfo, Dict[str, Any]]] = {}
+        self.resolved: Dict[int, Tuple[Any, Dict[int, Any]]] = {}
+        self.pending: List[Tuple[dict, FieldPlan, Any]] = []
+
+    def get_field(self, plan: FieldPlan) -> Tuple[GraphQLResolveInfo, Dict[str, Any]]:
+        field = self.fields.get(id(plan))
+        if field is None:
+            # The path of the shared resolve info points to the first entity
+            path = Path(
+                Path(self.entities_path, 0, None),
+                plan.response_key,
+                plan.parent_type.name,
+            )
+            info = self.exe_context.build_resolve_info(
+                plan.field_def, plan.field_nodes, plan.parent_type, path
+            )
+            args = get_argument_values(
+                plan.field_def, plan.field_nodes[0], self.exe_context.variable_values
+            )
+            field = self.fields[id(plan)] = (info, args)
+        return field
+
+    def get_resolved(self, source: Any) -> Dict[int, Any]:
+        """
+        Return the values returned by the resolvers for the source object (or the raised exceptions),
+        by field node id, see `ResolvedValuesMiddleware`.
+        Awaitable values are recorded as futures, which graphql-core can await again.
+        """
+        entry = self.resolved.get(id(source))
+        if entry is None:
+            entry = self.resolved[id(source)] = (source, {})
+        return entry[1]
+
+
+class ResolvedValuesMiddleware:
+    """
+    graphql-core middleware returning the values already resolved by the compiled completion (or raising their
+    errors), and calling the resolvers of the other fields.
+    """
+
+    def __init__(self, resolved: Dict[int, Tuple[Any, Dict[int, Any]]]):
+        self.resolved = resolved
+
+    def resolve(self, next_, root, info, **args):
+        entry = self.resolved.get(id(root))
+        if entry is not None:
+            value = entry[1].get(id(info.field_nodes[0]), Undefined)
+            if value is not Undefined:
+                # graphql-core raises the exceptions returned by the resolvers
+                return value
+        return next_(root, info, **args)
+
+
+def complete_object(plan: ObjectPlan, source: Any, state: ExecutionState) -> dict:
+    data = {}
+    resolved = state.get_resolved(source)
+    for field in plan.fields:
+        if field.field_def is None:
+            data[field.response_key] = plan.type_.name
+            continue
+
+        info, args = state.get_field(field)
+        try:
+            value = field.resolve(source, info, **args)
+        except Exception as error:
+            resolved[field.node_id] = error
+            raise FallbackToGraphQL()
+        if isawaitable(value):
+            value = resolved[field.node_id] = ensure_future(value)
+            data[field.response_key] = None
+            state.pending.append((data, field, value))
+        else:
+            resolved[field.node_id] = value
+            data[field.response_key] = complete_value(
+                field.value_plan, field.non_null, value, state
+            )
+    return data
+
+
+def get_object_plan(
+    plan: AbstractPlan, value: Any, state: ExecutionState
+) -> ObjectPlan:
+    """
+    Return the plan of the runtime type of the value.
+    """
+    resolve_type = plan.abstract_type.resolve_type or default_type_resolver
+    type_name = resolve_type(value, state.entities_info, plan.abstract_type)
+    if isawaitable(type_name):
+        if iscoroutine(type_name):
+            type_name.close()
+        raise FallbackToGraphQL()
+    if isinstance(type_name, GraphQLObjectType):
+        type_name = type_name.name
+    object_plan = plan.type_plans.get(type_name)
+    if object_plan is None:
+        raise FallbackToGraphQL()
+    return object_plan
+
+
+def complete_value(plan, non_null: bool, value: Any, state: ExecutionState) -> Any:
+    if value is None or value is Undefined:
+        if non_null:
+            raise FallbackToGraphQL()
+        return None
+
+    if isinstance(plan, LeafPlan):
+        serialized = plan.serialize(value)
+        if serialized is None or serialized is Undefined:
+            raise FallbackToGraphQL()
+        return serialized
+
+    if isinstance(plan, ListPlan):
+        if isinstance(value, (str, bytes, dict, Iterator)) or not hasattr(
+            value, "__iter__"
+        ):
+            # Including the one-shot iterators, left to graphql-core unconsumed
+            raise FallbackToGraphQL()
+        return [
+            complete_value(plan.item_plan, plan.item_non_null, item, state)
+            for item in value
+        ]
+
+    if isinstance(plan, AbstractPlan):
+        return complete_object(get_object_plan(plan, value, state), value, state)
+
+    return complete_object(plan, value, state)
+
+
+class EntitiesPlan:
+    """
+    Compiled plan of an operation whose only root field is `_entities`.
+    """
+
+    def __init__(self, schema: GraphQLSchema, document: DocumentNode, operation_name):
+        operation = get_operation_ast(document, operation_name)
+        if operation is None or operation.operation != OperationType.QUERY:
+            raise NotCompilable("Only queries can be compiled")
+        if operation.directives or len(operation.selection_set.selections) != 1:
+            raise NotCompilable("Only the `_entities` field can be compiled")
+        (field_node,) = operation.selection_set.selections
+        if (
+            not isinstance(field_node, FieldNode)
+            or field_node.name.value != ENTITIES_FIELD
+            or field_node.directives
+        ):
+            raise NotCompilable("Only the `_entities` field can be compiled")
+
+        self.query_type = schema.query_type
+        self.field_def = self.query_type.fields[ENTITIES_FIELD]
+        self.field_nodes = [field_node]
+        self.response_key = (field_node.alias or field_node.name).value
+        self.plan = FieldPlan(
+            self.response_key, self.field_def, self.field_nodes, self.query_type
+        )
+        self.plan.value_plan = PlanCompiler(schema, document).compile_value(
+            self.field_def.type, self.field_nodes
+        )
+        self.resolve_entities = self.field_def.resolve
+        set_resolvers(self.plan.value_plan)
+
+    @property
+    def scalar_only(self) -> bool:
+        """
+        Whether only leaf fields (scalars, enums and lists of them) are selected on the entities.
+        """
+        return all(
+            field.field_def is None or is_leaf_plan(field.value_plan)
+            for object_plan in self.plan.value_plan.item_plan.type_plans.values()
+            for field in object_plan.fields
+        )
+
+    def start(self, exe_context: ExecutionContext) -> ExecutionState:
+        path = Path(None, self.response_key, self.query_type.name)
+        info = exe_context.build_resolve_info(
+            self.field_def, self.field_nodes, self.query_type, path
+        )
+        return ExecutionState(exe_context, path, info)
+
+    async def resolve(self, state: ExecutionState) -> Any:
+        """
+        Resolve the `_entities` field.
+        """
+        exe_context = state.exe_context
+        args = get_argument_values(
+            self.field_def, self.field_nodes[0], exe_context.variable_values
+        )
+        entities = self.resolve_entities(
+            exe_context.root_value, state.entities_info, **args
+        )
+        if isawaitable(entities):
+            entities = await entities
+        return entities
+
+    async def complete(self, state: ExecutionState, entities: Any) -> Any:
+        """
+        Complete the resolved entities with the compiled plan.
+        Raise if anything goes wrong, in which case `complete_with_graphql` should be used.
+        """
+        data = complete_value(self.plan.value_plan, False, entities, state)
+        while state.pending:
+            pending, state.pending = state.pending, []
+            values = await gather(
+                *(value for _, _, value in pending), return_exceptions=True
+            )
+            if any(isinstance(value, BaseException) for value in values):
+                raise FallbackToGraphQL()
+            for (parent, field, _), value in zip(pending, values):
+                parent[field.response_key] = complete_value(
+                    field.value_plan, field.non_null, value, state
+                )
+        return data
+
+    async def complete_with_graphql(self, state: ExecutionState, entities: Any) -> Any:
+        """
+        Complete the resolved entities with graphql-core, reusing the values already resolved.
+        """
+        self.use_resolved_values(state)
+        try:
+            data = state.exe_context.complete_value(
+                self.field_def.type,
+                self.field_nodes,
+                state.entities_info,
+                state.entities_path,
+                entities,
+            )
+            if isawaitable(data):
+                data = await data
+        except Exception as error:
+            get_execution_errors(state.exe_context).append(
+                located_error(error, self.field_nodes, state.entities_path.as_list())
+            )
+            data = None
+        return data
+
+    async def complete_entity_with_graphql(
+        self, state: ExecutionState, index: int, entity: Any
+    ) -> Any:
+        """
+        Complete one of the resolved entities with graphql-core, reusing the values already resolved.
+        The items of the `_entities` list are nullable: the errors of an entity never affect the other ones.
+        """
+        self.use_resolved_values(state)
+        path = state.entities_path.add_key(index)
+        try:
+            data = state.exe_context.complete_value(
+                get_nullable_type(self.field_def.type).of_type,
+                self.field_nodes,
+                state.entities_info,
+                path,
+                entity,
+            )
+            if isawaitable(data):
+                data = await data
+        except Exception as error:
+            get_execution_errors(state.exe_context).append(
+                located_error(error, self.field_nodes, path.as_list())
+            )
+            data = None
+        return data
+
+    def use_resolved_values(self, state: ExecutionState):
+        state.pending = []
+        if state.exe_context.middleware_manager is None:
+            state.exe_context.middleware_manager = MiddlewareManager(
+                ResolvedValuesMiddleware(state.resolved)
+            )
+
+    def build_result(self, state: ExecutionState, data: Any) -> ExecutionResult:
+        return ExecutionResult(
+            {self.response_key: data}, get_execution_errors(state.exe_context) or None
+        )
+
+    def build_error_result(
+        self, state: ExecutionState, error: Exception
+    ) -> ExecutionResult:
+        return ExecutionResult(
+            {self.response_key: None},
+            [located_error(error, self.field_nodes, state.entities_path.as_list())],
+        )
+
+    async def execute(self, exe_context: ExecutionContext) -> ExecutionResult:
+        state = self.start(exe_context)
+        try:
+            entities = await self.resolve(state)
+        except Exception as error:
+            return self.build_error_result(state, error)
+
+        try:
+            data = await self.complete(state, entities)
+        except Exception:
+            data = await self.complete_with_graphql(state, entities)
+
+        return self.build_result(state, data)
+
+
+def is_leaf_plan(plan) -> bool:
+    while isinstance(plan, ListPlan):
+        plan = plan.item_plan
+    return isinstance(plan, LeafPlan)
+
+
+def set_resolvers(plan):
+    """
+    Set the resolver of each field of the plan, shared by all the objects.
+    """
+    if isinstance(plan, ListPlan):
+        set_resolvers(plan.item_plan)
+    elif isinstance(plan, AbstractPlan):
+        for object_plan in plan.type_plans.values():
+            set_resolvers(object_plan)
+    elif isinstance(plan, ObjectPlan):
+        for field in plan.fields:
+            if field.field_def is not None:
+                field.resolve = field.field_def.resolve or default_field_resolver
+                set_resolvers(field.value_plan)
+
+
+class EntitiesExecutor:
+    """
+    Execute the operations of a schema built with `build_schema`, with compiled plans for the `_entities` ones.
+
+        executor = EntitiesExecutor(schema)
+        result = await executor.execute(query, variables=variables, context_value=context)
+    """
+
+    def __init__(
+        self,
+        schema: Schema,
+        documents: Optional[DocumentCache] = None,
+        maxsize: int = 256,
+    ):
+        self.schema = schema
+        self.documents = documents or DocumentCache(schema)
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[Tuple[str, Optional[str]], Optional[EntitiesPlan]]" = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+
+    def get_plan(
+        self, document: DocumentNode, query_hash: str, operation_name: Optional[str]
+    ) -> Optional[EntitiesPlan]:
+        """
+        Return the compiled plan of the operation, or None if it can't be compiled.
+        """
+        key = (query_hash, operation_name)
+        with self._lock:
+            if key in self._plans:
+                self._plans.move_to_end(key)
+                return self._plans[key]
+
+        try:
+            plan = EntitiesPlan(self.schema.graphql_schema, document, operation_name)
+        except NotCompilable:
+            plan = None
+
+        with self._lock:
+            self._plans[key] = plan
+            if len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        return plan
+
+    async def execute(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None,
+        context_value: Any = None,
+        root_value: Any = None,
+        middleware: Optional[List[Any]] = None,
+        query_hash: Optional[str] = None,
+    ) -> ExecutionResult:
+        if query_hash is None:
+            query_hash = get_query_hash(query)
+        document, errors = self.documents.get(query, query_hash)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        plan = (
+            None if middleware else self.get_plan(document, query_hash, operation_name)
+        )
+        if plan is None:
+            return await self.documents.execute(
+                query,
+                variables=variables,
+                operation_name=operation_name,
+                context_value=context_value,
+                root_value=root_value,
+                middleware=middleware,
+                query_hash=query_hash,
+            )
+
+        exe_context = self.build_context(
+            document, variables, operation_name, context_value, root_value
+        )
+        if isinstance(exe_context, list):
+            return ExecutionResult(data=None, errors=exe_context)
+
+        return await plan.execute(exe_context)
+
+    def build_context(
+        self,
+        document: DocumentNode,
+        variables: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None,
+        context_value: Any = None,
+        root_value: Any = None,
+    ) -> Union[ExecutionContext, List[GraphQLError]]:
+        """
+        Build the execution context of a compiled operation, or return the variables coercion errors.
+        """
+        return ExecutionContext.build(
+            self.schema.graphql_schema,
+            document,
+            root_value=root_value,
+            context_value=context_value,
+            raw_variable_values=variables,
+            operation_name=operation_name,
+        )
@@ -59,18 +59,24 @@ def external(field):
     return field
 
 
-def requires(field, fields: Union[str, List[str]]):
+def requires(field, fields: Union[str, List[str]], batched: bool = False):
     """
     Mark the required fields for a given field.
     The input `fields` can be either a string or a list.
     When it is a string we split at spaces to get the list of fields.
+    The fields are validated against the parent type by `build_schema`; they can use nested selections.
+
+    The values sent by the gateway are available to the field resolver with `get_required_fields(self, info)`
+    (the operation must be executed with a context).
+    With `batched=True` the field resolver is called once with the list of all the entities of the `_entities`
+    response and must return the list of their values.
     """
-    # TODO: We should validate the `fields` input to check it is actually existing fields but we
-    # don't have access here to the parent graphene type.
     if isinstance(fields, str):
         fields = fields.split()
     assert not hasattr(
         field, "_requires"
     ), "Can't chain `requires()` method calls on one field."
     field._requires = fields
+    if batched:
+        field._batched = True
     return field
@@ -0,0 +1,391 @@
+"""
+Parsing and validation of the `fields` argument of the `@requires` and `@provides` directives.
+
+The field sets are resolved against the schema types once, when the schema is built, so that a typo fails at boot
+instead of at the gateway. They can use graphene attribute names or schema field names and nested selections, e.g.
+`requires(String(), fields="size dimensions { height width }")`.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from graphene import Schema
+from graphene.utils.str_converters import to_camel_case
+from graphql import (
+    FieldNode,
+    GraphQLError,
+    GraphQLResolveInfo,
+    GraphQLField,
+    GraphQLInterfaceType,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLOutputType,
+    NameNode,
+    SelectionSetNode,
+    get_named_type,
+    is_leaf_type,
+    parse,
+)
+
+
+from .graphql_compatibility import collect_sub_fields, get_type_map_from_schema
+from .utils import field_name_to_type_attribute, type_attribute_to_field_name
+
+FIELD_SET_DECORATORS = ("_requires", "_provides")
+
+
+class FieldSet:
+    """
+    A parsed field set of a type: the schema names of the selected fields mapped to the field set of their own
+    nested selection (or `None` for a leaf field).
+    """
+
+    __slots__ = ("type_name", "fields", "attributes", "field_types", "selection_set")
+
+    def __init__(
+        self,
+        type_name: str,
+        fields: Dict[str, Optional["FieldSet"]],
+        attributes: Dict[str, str],
+        field_types: Dict[str, GraphQLOutputType],
+        selection_set: SelectionSetNode,
+    ):
+        self.type_name = type_name
+        self.fields = fields
+        # Schema field name -> graphene_type attribute name
+        self.attributes = attributes
+        self.field_types = field_types
+        self.selection_set = selection_set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fields)
+
+    def __contains__(self, field_name: str) -> bool:
+        return field_name in self.fields
+
+    def __str__(self) -> str:
+        return " ".join(
+            name if field_set is None else f"{name} {{ {field_set} }}"
+            for name, field_set in self.fields.items()
+        )
+
+    def __repr__(self) -> str:
+        return f"<FieldSet {self.type_name} {{ {self} }}>"
+
+    def merge(self, other: "FieldSet") -> "FieldSet":
+        """
+        Return the union of two field sets of the same type.
+        """
+        fields = dict(self.fields)
+        for name, field_set in other.fields.items():
+            if fields.get(name) is not None and field_set is not None:
+                field_set = fields[name].merge(field_set)
+            fields[name] = fields.get(name) or field_set
+        return FieldSet(
+            self.type_name,
+            fields,
+            {**self.attributes, **other.attributes},
+            {**self.field_types, **other.field_types},
+            SelectionSetNode(
+                selections=(
+                    *self.selection_set.selections,
+                    *other.selection_set.selections,
+                )
+            ),
+        )
+
+    def parse_representation(self, representation: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Parse the values of the field set fields sent in a representation (or one of its nested objects) with their
+        schema types, e.g. enums and custom scalars.
+        Return them by graphene_type attribute name; the fields missing from the representation are left out.
+        """
+        values = {}
+        for name, field_set in self.fields.items():
+            if name in representation:
+                values[self.attributes[name]] = parse_field_value(
+                    self.field_types[name], field_set, representation[name]
+                )
+        return values
+
+
+def build_field_set(
+    type_name: str,
+    fields: Dict[str, Optional[FieldSet]],
+    attributes: Dict[str, str],
+    field_types: Dict[str, GraphQLOutputType],
+) -> FieldSet:
+    """
+    Build a field set and its selection set node from its fields.
+    """
+    selection_set = SelectionSetNode(
+        selections=tuple(
+            FieldNode(
+                name=NameNode(value=name),
+                selection_set=None if field_set is None else field_set.selection_set,
+            )
+            for name, field_set in fields.items()
+        )
+    )
+    return FieldSet(type_name, fields, attributes, field_types, selection_set)
+
+
+def parse_field_value(
+    type_: GraphQLOutputType, field_set: Optional[FieldSet], value: Any
+) -> Any:
+    if value is None:
+        return None
+    if isinstance(type_, GraphQLNonNull):
+        return parse_field_value(type_.of_type, field_set, value)
+    if isinstance(type_, GraphQLList):
+        return [parse_field_value(type_.of_type, field_set, item) for item in value]
+    if field_set is not None:
+        return field_set.parse_representation(value)
+    return type_.parse_value(value)
+
+
+def get_field_set_string(fields: Union[str, List[str]]) -> str:
+    if isinstance(fields, str):
+        return fields
+    return " ".join(fields)
+
+
+def get_schema_field_name(
+    schema: Schema, type_: Union[GraphQLObjectType, GraphQLInterfaceType], name: str
+) -> Optional[str]:
+    """
+    Find the schema name of a field given by its schema name or its graphene_type attribute name.
+    """
+    if name in type_.fields:
+        return name
+    graphene_type = getattr(type_, "graphene_type", None)
+    graphene_field = (
+        graphene_type._meta.fields.get(name)
+        if graphene_type is not None and hasattr(graphene_type._meta, "fields")
+        else None
+    )
+    if graphene_field is not None and getattr(graphene_field, "name", None):
+        return graphene_field.name
+    field_name = type_attribute_to_field_name(schema)(name)
+    if field_name in type_.fields:
+        return field_name
+    return None
+
+
+def resolve_selection_set(
+    schema: Schema,
+    type_: Union[GraphQLObjectType, GraphQLInterfaceType],
+    selection_set: SelectionSetNode,
+) -> FieldSet:
+    fields: Dict[str, Optional[FieldSet]] = {}
+    attributes: Dict[str, str] = {}
+    field_types: Dict[str, GraphQLOutputType] = {}
+    graphene_type = getattr(type_, "graphene_type", None)
+    get_model_attr = (
+        field_name_to_type_attribute(schema, graphene_type)
+        if graphene_type is not None and hasattr(graphene_type._meta, "fields")
+        else lambda name: name
+    )
+    for selection in selection_set.selections:
+        if not isinstance(selection, FieldNode) or selection.alias:
+            raise ValueError(
+                f'Field sets only support plain field selections, found "{selection.to_dict()}"'
+            )
+        field_name = get_schema_field_name(schema, type_, selection.name.value)
+        if field_name is None:
+            raise ValueError(
+                f'Field "{selection.name.value}" does not exist on type "{type_.name}"'
+            )
+        field_type = get_named_type(type_.fields[field_name].type)
+        if selection.selection_set is None:
+            if not is_leaf_type(field_type):
+                raise ValueError(
+                    f'Field "{type_.name}.{field_name}" of type "{field_type.name}" must have a selection of subfields'
+                )
+            fields[field_name] = None
+        else:
+            if not isinstance(field_type, (GraphQLObjectType, GraphQLInterfaceType)):
+                raise ValueError(
+                    f'Field "{type_.name}.{field_name}" of type "{field_type.name}" can\'t have a selection of subfields'
+                )
+            fields[field_name] = resolve_selection_set(
+                schema, field_type, selection.selection_set
+            )
+        attributes[field_name] = get_model_attr(field_name)
+        field_types[field_name] = type_.fields[field_name].type
+    return FieldSet(type_.name, fields, attributes, field_types, selection_set)
+
+
+def parse_field_set(
+    schema: Schema,
+    type_: Union[GraphQLObjectType, GraphQLInterfaceType],
+    fields: Union[str, List[str]],
+) -> FieldSet:
+    """
+    Parse a field set and resolve it against the given type.
+    Raise a `ValueError` if it is not a valid selection of the type fields.
+    """
+    try:
+        document = parse(f"{{ {get_field_set_string(fields)} }}", no_location=True)
+    except GraphQLError as e:
+        raise ValueError(f'Invalid field set "{get_field_set_string(fields)}": {e}')
+    return resolve_selection_set(schema, type_, document.definitions[0].selection_set)
+
+
+def get_graphene_field(entity: Any, model_attr: str) -> Any:
+    """
+    Find the field declared on the graphene_type, which holds the attributes set by the federation decorators.
+    """
+    field = getattr(entity, model_attr, None)
+    if field is None:
+        for k, v in entity._meta.fields.items():
+            if getattr(v, "name", None) == model_attr:
+                return getattr(entity, k, None)
+    return field
+
+
+def iter_decorated_fields(
+    schema: Schema, type_: GraphQLObjectType
+) -> Iterator[Tuple[str, GraphQLField, Any]]:
+    """
+    Iterate over the schema name, the schema field and the graphene field of each field of the given type.
+    """
+    entity = type_.graphene_type
+    get_model_attr = field_name_to_type_attribute(schema, entity)
+    for field_name, field in type_.fields.items():
+        yield field_name, field, get_graphene_field(entity, get_model_attr(field_name))
+
+
+def get_field_sets(schema: Schema) -> Dict[str, Dict[Tuple[str, str], FieldSet]]:
+    """
+    Validate and parse the `@requires` and `@provides` field sets of the schema.
+    Return them by decorator attribute (`_requires` or `_provides`) and by (type name, field name).
+
+    The `@requires` fields are resolved against the type declaring the field and the `@provides` fields against
+    the type returned by the field.
+    """
+    field_sets: Dict[str, Dict[Tuple[str, str], FieldSet]] = {
+        decorator: {} for decorator in FIELD_SET_DECORATORS
+    }
+    for type_name, type_ in get_type_map_from_schema(schema).items():
+        graphene_type = getattr(type_, "graphene_type", None)
+        if (
+            not isinstance(type_, GraphQLObjectType)
+            or graphene_type is None
+            or not hasattr(graphene_type._meta, "fields")
+        ):
+            continue
+        for field_name, field, graphene_field in iter_decorated_fields(schema, type_):
+            if graphene_field is None:
+                continue
+            for decorator in FIELD_SET_DECORATORS:
+                fields = getattr(graphene_field, decorator, None)
+                if not fields:
+                    continue
+                target = type_
+                if decorator == "_provides":
+                    target = get_named_type(field.type)
+                    if not isinstance(
+                        target, (GraphQLObjectType, GraphQLInterfaceType)
+                    ):
+                        raise ValueError(
+                            f'@provides on field "{type_name}.{field_name}" of type "{target.name}" '
+                            f"which has no fields"
+                        )
+                try:
+                    field_set = parse_field_set(schema, target, fields)
+                except ValueError as e:
+                    directive = decorator.lstrip("_")
+                    raise ValueError(
+                        f'Invalid @{directive} fields on "{type_name}.{field_name}": {e}'
+                    ) from None
+                field_sets[decorator][(type_name, field_name)] = field_set
+    return field_sets
+
+
+def set_field_sets_extensions(
+    schema: Schema, field_sets: Dict[str, Dict[Tuple[str, str], FieldSet]]
+):
+    """
+    Make the field sets available at runtime in the `requires` and `provides` extensions of the schema fields.
+    """
+    type_map = get_type_map_from_schema(schema)
+    for decorator, decorator_field_sets in field_sets.items():
+        for (type_name, field_name), field_set in decorator_field_sets.items():
+            field = type_map[type_name].fields[field_name]
+            field.extensions = {
+                **(field.extensions or {}),
+                decorator.lstrip("_"): field_set,
+            }
+
+
+def get_required_field_sets(
+    field_sets: Dict[str, Dict[Tuple[str, str], FieldSet]]
+) -> Dict[str, FieldSet]:
+    """
+    Merge the `@requires` field sets of the fields of each type, by type name.
+    """
+    required: Dict[str, FieldSet] = {}
+    for (type_name, _), field_set in field_sets["_requires"].items():
+        if type_name in required:
+            field_set = required[type_name].merge(field_set)
+        required[type_name] = field_set
+    return required
+
+
+def get_type_attributes(type_: GraphQLObjectType) -> Dict[str, str]:
+    """
+    Map the schema field names of a type to the attribute names of its graphene_type.
+    """
+    attributes: Dict[str, str] = {}
+    graphene_type = getattr(type_, "graphene_type", None)
+    if graphene_type is None or not hasattr(graphene_type._meta, "fields"):
+        return attributes
+    for attr_name, field in graphene_type._meta.fields.items():
+        for name in (getattr(field, "name", None), attr_name, to_camel_case(attr_name)):
+            if name in type_.fields and name not in attributes:
+                attributes[name] = attr_name
+                break
+    return attributes
+
+
+def get_selected_field_set(
+    info: GraphQLResolveInfo,
+    type_: GraphQLObjectType,
+    field_nodes: List[FieldNode],
+    restrict: Optional[FieldSet] = None,
+) -> FieldSet:
+    """
+    Collect the fields of an object type selected by the given field nodes as a field set, following the fragments
+    and the `@skip` / `@include` directives, optionally restricted to the fields of another field set.
+    The nested selections of abstract types are not collected: their field set is `None` (or the restricting one).
+    """
+    sub_fields = collect_sub_fields(
+        info.schema, info.fragments, info.variable_values, type_, field_nodes
+    )
+    selected_nodes: Dict[str, List[FieldNode]] = {}
+    for nodes in sub_fields.values():
+        name = nodes[0].name.value
+        if name.startswith("__") or (restrict is not None and name not in restrict):
+            continue
+        selected_nodes.setdefault(name, []).extend(nodes)
+
+    type_attributes = (
+        restrict.attributes if restrict is not None else get_type_attributes(type_)
+    )
+    fields: Dict[str, Optional[FieldSet]] = {}
+    attributes: Dict[str, str] = {}
+    field_types: Dict[str, GraphQLOutputType] = {}
+    for name, nodes in selected_nodes.items():
+        field_type = type_.fields[name].type
+        nested_type = get_named_type(field_type)
+        nested_field_set = restrict.fields[name] if restrict is not None else None
+        if isinstance(nested_type, GraphQLObjectType) and (
+            restrict is None or nested_field_set is not None
+        ):
+            nested_field_set = get_selected_field_set(
+                info, nested_type, nodes, nested_field_set
+            )
+        fields[name] = nested_field_set
+        attributes[name] = type_attributes.get(name, name)
+        field_types[name] = field_type
+    return build_field_set(type_.name, fields, attributes, field_types)
@@ -2,11 +2,19 @@
 Allows the project to interact to graphql using both graphene 2.1.8 and 3.0.0b7.
 Other function to preserve backwards compatibiolity may be added in the future
 """
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from graphene import Schema
 from graphene.types.schema import TypeMap
-from graphql import GraphQLSchema
+from graphql import (
+    ExecutionResult,
+    FieldNode,
+    FragmentDefinitionNode,
+    GraphQLError,
+    GraphQLObjectType,
+    GraphQLSchema,
+)
+from graphql.execution import ExecutionContext
 from graphql.utilities.print_schema import (
     print_args,
     print_deprecated,
@@ -14,6 +22,14 @@ from graphql.utilities.print_schema import (
     print_schema,
 )
 
+try:
+    from graphql.execution.collect_fields import (
+        collect_sub_fields as graphql_collect_sub_fields,
+    )
+except ImportError:  # pragma: no cover
+    # graphql-core < 3.2
+    graphql_collect_sub_fields = None
+
 
 def call_schema_print_fields(schema: Schema, t: type) -> str:
     # copy of print_fields from graphene 3.0.0 where we avoid calling print_blocks
@@ -75,3 +91,51 @@ def is_schema_in_auto_camelcase(schema: Schema) -> bool:
     else:
         # Otherwise we trat it as the camel case is set
         return True
+
+
+def get_execution_errors(exe_context: ExecutionContext) -> List[GraphQLError]:
+    # Recent graphql-core versions collect the errors in a `collected_errors` attribute instead of `errors`
+    collected_errors = getattr(exe_context, "collected_errors", None)
+    if collected_errors is not None:
+        return collected_errors.errors
+    return exe_context.errors
+
+
+def collect_sub_fields(
+    schema: GraphQLSchema,
+    fragments: Dict[str, FragmentDefinitionNode],
+    variable_values: Dict[str, Any],
+    return_type: GraphQLObjectType,
+    field_nodes: List[FieldNode],
+) -> Dict[str, List[FieldNode]]:
+    """
+    Collect the sub fields of the given field nodes selected on the return type, by response key.
+    """
+    if graphql_collect_sub_fields is not None:
+        return graphql_collect_sub_fields(
+            schema, fragments, variable_values, return_type, field_nodes
+        )
+    # graphql-core 3.1 only collects the fields with the methods of an execution context
+    exe_context = ExecutionContext.__new__(ExecutionContext)
+    exe_context.schema = schema
+    exe_context.fragments = fragments
+    exe_context.variable_values = variable_values
+    sub_fields: Dict[str, List[FieldNode]] = {}
+    visited_fragment_names = set()
+    for field_node in field_nodes:
+        if field_node.selection_set:
+            exe_context.collect_fields(
+                return_type,
+                field_node.selection_set,
+                sub_fields,
+                visited_fragment_names,
+            )
+    return sub_fields
+
+
+def get_formatted_result(result: ExecutionResult) -> Dict[str, Any]:
+    # graphql-core 3.1 formats the results without errors with `"errors": None`
+    formatted = result.formatted
+    if formatted.get("errors") is None:
+        formatted.pop("errors", None)
+    return formatted
@@ -0,0 +1,50 @@
+from typing import Any, List, Optional
+
+from graphql import GraphQLResolveInfo
+
+from .utils import get_model_key
+
+
+class EntityGroupStats:
+    """
+    Statistics about the resolution of the `_entities` representations of a single type using the same key field.
+
+    `key` is the key field of the representations of the group.
+    `strategy` is the resolution path that ran: `references` (`__resolve_references`), `bulk`
+    (`_resolve_reference_bulk`), `reference` (per instance `__resolve_reference`) or `lazy` (`__load_fields`).
+    `duration` (in seconds) and `misses` (distinct keys resolved to `None`) are only available once the
+    group is resolved, `error` is set if the resolution failed.
+    A `lazy` group is resolved to proxies before `__load_fields` runs: its `misses` is always 0 and its `duration`
+    doesn't include the loading of the fields.
+    Hooks are free to set additional attributes on it (e.g. to keep track of a span).
+    """
+
+    def __init__(self, model: Any, representations: List[dict]):
+        self.typename: str = model._meta.name
+        self.model = model
+        self.representations: int = len(representations)
+        self.key: Optional[str] = (
+            get_model_key(model, representations[0]) if representations else None
+        )
+        self.keys: List[Any] = list(dict.fromkeys(r[self.key] for r in representations))
+        self.strategy: Optional[str] = None
+        self.duration: Optional[float] = None
+        self.misses: Optional[int] = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def key_count(self) -> int:
+        return len(self.keys)
+
+
+class EntityResolutionHooks:
+    """
+    Base class for the `_entities` instrumentation hooks passed to `build_schema(entity_hooks=...)`.
+    Both methods are called once per (type, key field) group of the `_entities` representations.
+    """
+
+    def on_group_start(self, info: GraphQLResolveInfo, stats: EntityGroupStats):
+        pass
+
+    def on_group_end(self, info: GraphQLResolveInfo, stats: EntityGroupStats):
+        pass
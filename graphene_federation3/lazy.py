@@ -0,0 +1,185 @@
+"""
+Lazy entities, loading their fields in batch on first access.
+
+An entity type defining a `__load_fields(cls, info, key, values, fields)` classmethod (and no other entity resolver)
+is resolved by `_entities` to lazy proxies holding only their key. The first field resolved on any of the proxies of
+a (type, key) group triggers a single call to `__load_fields` with the key attribute name, the key values of all the
+proxies (`ID` keys decoded from their global id) and the attribute names of the fields the operation selects on the
+type besides the key. It returns the loaded rows (mappings or objects) by key value, or an awaitable of them:
+
+    @key("id")
+    class User(ObjectType):
+        id = ID(required=True)
+        email = String()
+        name = String()
+
+        @classmethod
+        def __load_fields(cls, info, key, values, fields):
+            return {row["id"]: row for row in get_users(ids=values, columns=["id", *fields])}
+"""
+from asyncio import ensure_future
+from inspect import isawaitable
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional
+
+from graphene import Schema
+from graphql import GraphQLResolveInfo, default_field_resolver
+
+from .field_set import get_type_attributes
+from .graphql_compatibility import get_type_map_from_schema
+from .stub import get_type_namespace
+
+LAZY_LOAD_ATTRIBUTE = "_lazy_load"
+
+
+class LazyLoad:
+    """
+    The batched load of the missing fields of the lazy entities of a (type, key) group.
+    """
+
+    __slots__ = ("loader", "info", "key", "fields", "entities", "state")
+
+    def __init__(
+        self,
+        loader: Callable,
+        info: GraphQLResolveInfo,
+        key: str,
+        fields: List[str],
+    ):
+        self.loader = loader
+        self.info = info
+        self.key = key
+        self.fields = fields
+        self.entities: List[Any] = []
+        # `None` before loading, then the loading future, `True` once loaded or the raised exception
+        self.state: Any = None
+
+    def add(self, entity: Any) -> Any:
+        setattr(entity, LAZY_LOAD_ATTRIBUTE, self)
+        self.entities.append(entity)
+        return entity
+
+    def load(self) -> Optional[Awaitable]:
+        """
+        Load the fields of all the entities on the first call.
+        Return an awaitable while they are loaded asynchronously.
+        """
+        if self.state is None:
+            try:
+                result = self.loader(
+                    self.info,
+                    self.key,
+                    [getattr(entity, self.key) for entity in self.entities],
+                    self.fields,
+                )
+                if isawaitable(result):
+                    self.state = ensure_future(self.set_awaited_rows(result))
+                else:
+                    self.set_rows(result)
+            except Exception as e:
+                self.state = e
+
+        if self.state is True:
+            return None
+        if isinstance(self.state, Exception):
+            raise self.state
+        return self.state
+
+    async def set_awaited_rows(self, result: Awaitable):
+        self.set_rows(await result)
+
+    def set_rows(self, rows: Mapping[Any, Any]):
+        for entity in self.entities:
+            row = rows.get(getattr(entity, self.key))
+            for field in self.fields:
+                if row is None:
+                    value = None
+                elif isinstance(row, Mapping):
+                    value = row.get(field)
+                else:
+                    value = getattr(row, field, None)
+                setattr(entity, field, value)
+        self.state = True
+
+
+def get_lazy_entity_cls(model) -> type:
+    """
+    Create the lazy proxy class of an entity type: a `__slots__` class sharing its class attributes (see
+    `stub.get_type_namespace`), whose unset fields read as `None`.
+    Like the entity stubs (see `stub`), the proxies are resolved to their entity type by the `_Entity` union.
+    """
+    fields = tuple(model._meta.fields)
+    field_names = frozenset(fields)
+
+    def __init__(self, **kwargs):
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def __getattr__(self, name):
+        # Only called for the unset slots (and unknown attributes)
+        if name in field_names:
+            return None
+        raise AttributeError(f"'{model.__name__}' object has no attribute '{name}'")
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in fields)
+        return f"{model.__name__}({values})"
+
+    namespace = {
+        **get_type_namespace(model),
+        "__slots__": (*fields, LAZY_LOAD_ATTRIBUTE),
+        "__init__": __init__,
+        "__getattr__": __getattr__,
+        "__repr__": __repr__,
+        "__module__": model.__module__,
+        "__qualname__": model.__qualname__,
+        "_entity_type": model,
+        "_meta": model._meta,
+    }
+    return type(model.__name__, (), namespace)
+
+
+def get_lazy_resolver(resolver: Callable, attname: str) -> Callable:
+    """
+    Wrap the resolver of a field of a lazy entity type, to load the fields of the lazy entities before resolving
+    the first of them.
+    """
+
+    def resolve(root, info, **args):
+        load: Optional[LazyLoad] = getattr(root, LAZY_LOAD_ATTRIBUTE, None)
+        if load is not None and attname in load.fields:
+            loading = load.load()
+            if loading is not None:
+                return resolve_loaded(loading, resolver, root, info, args)
+        return resolver(root, info, **args)
+
+    resolve._lazy_resolver = resolver
+    return resolve
+
+
+async def resolve_loaded(
+    loading: Awaitable,
+    resolver: Callable,
+    root: Any,
+    info: GraphQLResolveInfo,
+    args: Dict[str, Any],
+) -> Any:
+    await loading
+    result = resolver(root, info, **args)
+    if isawaitable(result):
+        result = await result
+    return result
+
+
+def set_lazy_resolvers(schema: Schema, lazy_types: Iterable[str]):
+    """
+    Wrap the resolvers of the fields of the lazy entity types of the schema with `get_lazy_resolver`.
+    """
+    type_map = get_type_map_from_schema(schema)
+    for type_name in lazy_types:
+        type_ = type_map[type_name]
+        for field_name, attname in get_type_attributes(type_).items():
+            field = type_.fields[field_name]
+            if not hasattr(field.resolve, "_lazy_resolver"):
+                field.resolve = get_lazy_resolver(
+                    field.resolve or default_field_resolver, attname
+                )
@@ -0,0 +1,133 @@
+from asyncio import Future, ensure_future, get_running_loop
+from typing import Any, Dict, List, Optional, Tuple
+
+from graphql import GraphQLObjectType, GraphQLResolveInfo
+
+from .utils import get_model_key
+
+ENTITY_LOADER_ATTRIBUTE = "entity_loader"
+
+
+def get_entity_loader(context: Any) -> Optional["EntityLoader"]:
+    if isinstance(context, dict):
+        return context.get(ENTITY_LOADER_ATTRIBUTE)
+    return getattr(context, ENTITY_LOADER_ATTRIBUTE, None)
+
+
+def set_entity_loader(context: Any, loader: "EntityLoader"):
+    if isinstance(context, dict):
+        context[ENTITY_LOADER_ATTRIBUTE] = loader
+    else:
+        setattr(context, ENTITY_LOADER_ATTRIBUTE, loader)
+
+
+class EntityBatch:
+    __slots__ = (
+        "entity_query",
+        "info",
+        "infos",
+        "type_",
+        "representations",
+        "futures",
+        "strategy",
+    )
+
+    def __init__(
+        self, entity_query, info: GraphQLResolveInfo, type_: GraphQLObjectType
+    ):
+        self.entity_query = entity_query
+        self.info = info
+        self.infos = [info]
+        self.type_ = type_
+        self.representations: List[dict] = []
+        self.futures: List[Tuple[Any, Future]] = []
+        self.strategy: Optional[str] = None
+
+
+class EntityLoader:
+    """
+    Request scoped loader sharing the `_entities` resolution between the operations executed concurrently
+    with the same context (e.g. the operations of a batched HTTP request).
+
+    The representations of a type (by the same key field) requested during the same event loop iteration are
+    resolved together,
+    with the resolve info of the first operation requesting them, and each key is resolved once per request.
+    The resolvers taking a `selection` argument get the fields selected by all the operations joining the batch
+    before it is dispatched.
+    It is used by `resolve_entities` when set as the `entity_loader` attribute (or key) of the context.
+    """
+
+    def __init__(self):
+        self._futures: Dict[Tuple[str, str, Any], Future] = {}
+        self._batches: Dict[Tuple[str, str], EntityBatch] = {}
+
+    async def load(
+        self,
+        entity_query,
+        info: GraphQLResolveInfo,
+        type_: GraphQLObjectType,
+        representations: List[dict],
+        results_dict: Dict[Any, Any],
+    ) -> Optional[str]:
+        """
+        Resolve representations of a type using the same key field, like `resolve_type_group`.
+        """
+        if not representations:
+            return None
+        loop = get_running_loop()
+        key_name = get_model_key(type_.graphene_type, representations[0])
+        batch_key = (type_.name, key_name)
+        batch = None
+        waiting = []
+
+        pending = self._batches.get(batch_key)
+        if pending is not None and not any(i is info for i in pending.infos):
+            # The keys of this operation may already be pending in that batch
+            pending.infos.append(info)
+
+        for representation in representations:
+            key = representation[key_name]
+            future = self._futures.get((*batch_key, key))
+            if future is None:
+                future = self._futures[(*batch_key, key)] = loop.create_future()
+                batch = self._batches.get(batch_key)
+                if batch is None:
+                    batch = self._batches[batch_key] = EntityBatch(
+                        entity_query, info, type_
+                    )
+                    loop.call_soon(ensure_future, self.dispatch(batch_key))
+                batch.representations.append(representation)
+                batch.futures.append((key, future))
+            waiting.append((key, future))
+
+        error = None
+        for key, future in waiting:
+            try:
+                results_dict[key] = await future
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+        return batch.strategy if batch is not None else None
+
+    async def dispatch(self, batch_key: Tuple[str, str]):
+        batch = self._batches.pop(batch_key)
+        results: Dict[Any, Any] = {}
+        try:
+            selection = None
+            if len(batch.infos) > 1:
+                selection = batch.entity_query.get_type_selection(
+                    batch.infos, batch.type_
+                )
+            batch.strategy = await batch.entity_query.resolve_type_group(
+                batch.info, batch.type_, batch.representations, results, selection
+            )
+        except Exception as e:
+            for key, future in batch.futures:
+                # Let the next operations requesting those keys try again
+                self._futures.pop((*batch_key, key), None)
+                future.set_exception(e)
+        else:
+            for key, future in batch.futures:
+                future.set_result(results.get(key))
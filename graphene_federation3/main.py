@@ -1,12 +1,30 @@
 import graphene
 
-from .entity import get_entity_query
+from .batching import set_batched_resolvers
+from .entity import get_entity_query, get_lazy_types
+from .field_set import get_field_sets, set_field_sets_extensions
+from .lazy import set_lazy_resolvers
 from .service import get_service_query
 
 
-def _get_query(schema, query_cls=None):
-    bases = [get_service_query(schema)]
-    entity_cls = get_entity_query(schema)
+def _get_query(
+    schema,
+    query_cls=None,
+    entity_hooks=(),
+    field_sets=None,
+    blocking_resolvers=False,
+    blocking_executor=None,
+    entity_stubs=False,
+):
+    bases = [get_service_query(schema, field_sets)]
+    entity_cls = get_entity_query(
+        schema,
+        entity_hooks,
+        field_sets,
+        blocking_resolvers,
+        blocking_executor,
+        entity_stubs,
+    )
     if entity_cls:
         bases.append(entity_cls)
     if query_cls is not None:
@@ -16,9 +34,47 @@ def _get_query(schema, query_cls=None):
     return federated_query_cls
 
 
-def build_schema(query=None, mutation=None, **kwargs):
+def build_schema(
+    query=None,
+    mutation=None,
+    entity_hooks=(),
+    blocking_resolvers=False,
+    blocking_executor=None,
+    entity_stubs=False,
+    **kwargs,
+):
+    """
+    Build a federated graphene schema.
+    `entity_hooks` is an optional list of `EntityResolutionHooks` instrumenting the `_entities` resolution.
+    `blocking_resolvers` makes the synchronous entity resolvers run on `blocking_executor` (a bounded
+    `concurrent.futures` executor, the default executor of the event loop if `None`) and awaited concurrently,
+    unless their type is decorated with `@key(..., blocking=False)`.
+    `entity_stubs` builds the entities of the types without reference resolver as lightweight stubs, see `stub`.
+
+    The `@requires` and `@provides` field sets are validated against the schema types (raising a `ValueError` for
+    unknown fields) and the parsed `FieldSet`s are kept in the `field_sets` attribute of the returned schema, and in
+    the `requires` / `provides` extensions of the fields.
+    """
     schema = graphene.Schema(query=query, mutation=mutation, **kwargs)
     if "auto_camelcase" in kwargs:
         # forcibly set the auto_camelcase to ensure we can safely retrieve it
         schema.auto_camelcase = kwargs["auto_camelcase"]
-    return graphene.Schema(query=_get_query(schema, query), mutation=mutation, **kwargs)
+    field_sets = get_field_sets(schema)
+    federated_schema = graphene.Schema(
+        query=_get_query(
+            schema,
+            query,
+            entity_hooks,
+            field_sets,
+            blocking_resolvers,
+            blocking_executor,
+            entity_stubs,
+        ),
+        mutation=mutation,
+        **kwargs,
+    )
+    federated_schema.field_sets = field_sets
+    set_field_sets_extensions(federated_schema, field_sets)
+    set_batched_resolvers(federated_schema)
+    set_lazy_resolvers(federated_schema, get_lazy_types(federated_schema))
+    return federated_schema
@@ -0,0 +1,124 @@
+"""
+Automatic persisted queries (APQ) support.
+See specification: https://www.apollographql.com/docs/apollo-server/performance/apq/
+
+The clients send the sha256 hash of the query in the `persistedQuery` extension instead of the query text.
+When the hash is unknown, a `PersistedQueryNotFound` error is returned and the client sends the query again
+with its hash, registering it.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from inspect import isawaitable
+from threading import Lock
+from typing import Any, Awaitable, Dict, Optional, Union
+
+from .document_cache import get_query_hash
+
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+PERSISTED_QUERY_NOT_FOUND_CODE = "PERSISTED_QUERY_NOT_FOUND"
+
+
+class PersistedQueryError(Exception):
+    def __init__(self, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.code = code
+
+    @property
+    def formatted(self) -> Dict[str, Any]:
+        error: Dict[str, Any] = {"message": str(self)}
+        if self.code:
+            error["extensions"] = {"code": self.code}
+        return error
+
+
+class PersistedQueryStore(ABC):
+    """
+    Base class of the persisted queries storage backends.
+    Both methods can be coroutines, e.g. for a store backed by Redis.
+    """
+
+    @abstractmethod
+    def get(self, query_hash: str) -> Union[Optional[str], Awaitable[Optional[str]]]:
+        """
+        Return the query registered with the hash, or None.
+        """
+
+    @abstractmethod
+    def set(self, query_hash: str, query: str) -> Optional[Awaitable[None]]:
+        """
+        Register the query with its hash.
+        """
+
+
+class InMemoryPersistedQueryStore(PersistedQueryStore):
+    """
+    Bounded LRU in-memory store.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._queries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    def get(self, query_hash: str) -> Optional[str]:
+        with self._lock:
+            query = self._queries.get(query_hash)
+            if query is not None:
+                self._queries.move_to_end(query_hash)
+            return query
+
+    def set(self, query_hash: str, query: str):
+        with self._lock:
+            self._queries[query_hash] = query
+            self._queries.move_to_end(query_hash)
+            if len(self._queries) > self.maxsize:
+                self._queries.popitem(last=False)
+
+
+def get_persisted_query_hash(params: Dict[str, Any]) -> Optional[str]:
+    extensions = params.get("extensions")
+    if not isinstance(extensions, dict):
+        return None
+    persisted_query = extensions.get("persistedQuery")
+    if not isinstance(persisted_query, dict):
+        return None
+    if persisted_query.get("version", 1) != 1:
+        raise PersistedQueryError("Unsupported persisted query version")
+    query_hash = persisted_query.get("sha256Hash")
+    if not isinstance(query_hash, str):
+        raise PersistedQueryError("The persisted query sha256Hash is missing")
+    return query_hash
+
+
+async def resolve_persisted_query(
+    store: PersistedQueryStore, params: Dict[str, Any]
+) -> Optional[str]:
+    """
+    Return the query of the operation parameters: either the given query, registered when a hash is also given,
+    or the query stored for the given hash.
+    Raise a `PersistedQueryError` if the hash is unknown or doesn't match the given query.
+    """
+    query = params.get("query")
+    query_hash = get_persisted_query_hash(params)
+    if query_hash is None:
+        return query
+
+    if query is None:
+        query = store.get(query_hash)
+        if isawaitable(query):
+            query = await query
+        if query is None:
+            raise PersistedQueryError(
+                PERSISTED_QUERY_NOT_FOUND, PERSISTED_QUERY_NOT_FOUND_CODE
+            )
+        return query
+
+    if get_query_hash(query) != query_hash:
+        raise PersistedQueryError("The provided sha256Hash does not match the query")
+    stored = store.set(query_hash, query)
+    if isawaitable(stored):
+        await stored
+    return query
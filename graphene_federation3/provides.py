@@ -1,8 +1,10 @@
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, NamedTuple, Optional, Union
 
 from graphene import Field, Schema
+from graphql import GraphQLObjectType, GraphQLResolveInfo, get_named_type
 
 from graphene_federation3 import graphql_compatibility
+from graphene_federation3.field_set import FieldSet, get_selected_field_set
 
 
 def get_provides_parent_types(schema: Schema) -> Dict[str, Any]:
@@ -34,9 +36,41 @@ def provides(field, fields: Union[str, List[str]] = None):
             raise ValueError("Please specify fields")
         field._provide_parent_type = True
     else:  # used as wrapper over field
-        # TODO: We should validate the `fields` input to check it is actually existing fields but we
-        # don't have access here to the graphene type of the object it provides those fields for.
+        # The fields are validated against the provided type by `build_schema`
         if isinstance(fields, str):
             fields = fields.split()
         field._provides = fields
     return field
+
+
+class ProvidedFields(NamedTuple):
+    """
+    The `@provides` fields of the field being resolved and the ones selected by the current operation.
+    """
+
+    provided: FieldSet
+    selected: FieldSet
+
+
+def get_provided_fields(info: GraphQLResolveInfo) -> Optional[ProvidedFields]:
+    """
+    Return the `@provides` fields of the field being resolved, with the ones selected by the current operation,
+    or `None` if the field has no `@provides` directive.
+    A resolver can use it to load only the provided fields which will be returned, e.g.:
+
+        def resolve_author(self, info):
+            provided = get_provided_fields(info)
+            return User.load(self.author_id, only=provided.selected.attributes.values())
+    """
+    # graphql-core 3.1 defaults the extensions to None
+    field = info.parent_type.fields[info.field_name]
+    field_set = (field.extensions or {}).get("provides")
+    if field_set is None:
+        return None
+    type_ = get_named_type(info.return_type)
+    if not isinstance(type_, GraphQLObjectType):
+        # The selection on an interface depends on the concrete type
+        return ProvidedFields(field_set, field_set)
+    return ProvidedFields(
+        field_set, get_selected_field_set(info, type_, info.field_nodes, field_set)
+    )
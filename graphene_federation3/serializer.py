@@ -0,0 +1,203 @@
+"""
+Fast JSON serialization of large `_entities` responses.
+
+For compiled `_entities` operations selecting only leaf fields (scalars, enums and lists of them), the response JSON
+is written straight from the resolved entities to a text stream, one entity at a time, instead of building the
+nested result dicts and encoding them afterwards.
+An entity which can't be written that way (a resolver error, a `null` non-null field...) is completed by
+graphql-core instead, reusing its resolved values, and the errors are written after the data.
+Other operations are executed by the `EntitiesExecutor` and their result encoded with `dumps`.
+"""
+import json
+from asyncio import ensure_future
+from collections.abc import Iterator
+from inspect import isawaitable
+from io import StringIO
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from graphene import Schema
+from graphql import Undefined
+
+from .document_cache import get_query_hash
+from .executor import (
+    EntitiesExecutor,
+    EntitiesPlan,
+    ExecutionState,
+    FallbackToGraphQL,
+    LeafPlan,
+    ObjectPlan,
+    get_object_plan,
+)
+from .graphql_compatibility import get_execution_errors, get_formatted_result
+
+
+def encode_leaf(value: Any) -> str:
+    value_type = type(value)
+    if value_type is str:
+        return encode_basestring_ascii(value)
+    if value_type is bool:
+        return "true" if value else "false"
+    if value_type is int:
+        return int.__repr__(value)
+    return json.dumps(value)
+
+
+def write_value(
+    plan, non_null: bool, value: Any, state: ExecutionState, chunks: List[str]
+):
+    if value is None or value is Undefined:
+        if non_null:
+            raise FallbackToGraphQL()
+        chunks.append("null")
+        return
+
+    if isawaitable(value):
+        # Awaited by graphql-core
+        raise FallbackToGraphQL()
+
+    if isinstance(plan, LeafPlan):
+        serialized = plan.serialize(value)
+        if serialized is None or serialized is Undefined:
+            raise FallbackToGraphQL()
+        chunks.append(encode_leaf(serialized))
+        return
+
+    if isinstance(value, (str, bytes, dict, Iterator)) or not hasattr(
+        value, "__iter__"
+    ):
+        raise FallbackToGraphQL()
+    chunks.append("[")
+    for i, item in enumerate(value):
+        if i:
+            chunks.append(",")
+        write_value(plan.item_plan, plan.item_non_null, item, state, chunks)
+    chunks.append("]")
+
+
+def write_object(
+    plan: ObjectPlan, source: Any, state: ExecutionState, chunks: List[str]
+):
+    chunks.append("{")
+    resolved = state.get_resolved(source)
+    for i, field in enumerate(plan.fields):
+        if i:
+            chunks.append(",")
+        chunks.append(field.json_key)
+        if field.field_def is None:
+            chunks.append(encode_basestring_ascii(plan.type_.name))
+            continue
+
+        info, args = state.get_field(field)
+        try:
+            value = field.resolve(source, info, **args)
+        except Exception as error:
+            resolved[field.node_id] = error
+            raise FallbackToGraphQL()
+        if isawaitable(value):
+            value = ensure_future(value)
+        resolved[field.node_id] = value
+        write_value(field.value_plan, field.non_null, value, state, chunks)
+    chunks.append("}")
+
+
+class EntitiesSerializer:
+    """
+    Execute operations and write their JSON response to a text stream (only written to, never seeked), e.g.:
+
+        serializer = EntitiesSerializer(schema)
+        buffer = StringIO()
+        await serializer.write(buffer, query, variables=variables, context_value=context)
+    """
+
+    def __init__(
+        self,
+        schema: Schema,
+        executor: Optional[EntitiesExecutor] = None,
+        dumps: Callable[[Any], str] = json.dumps,
+    ):
+        self.executor = executor or EntitiesExecutor(schema)
+        self.dumps = dumps
+
+    async def serialize(self, query: str, **kwargs) -> str:
+        buffer = StringIO()
+        await self.write(buffer, query, **kwargs)
+        return buffer.getvalue()
+
+    async def write(
+        self,
+        fp: TextIO,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None,
+        context_value: Any = None,
+        root_value: Any = None,
+        query_hash: Optional[str] = None,
+    ):
+        executor = self.executor
+        if query_hash is None:
+            query_hash = get_query_hash(query)
+        document, errors = executor.documents.get(query, query_hash)
+        plan = (
+            None if errors else executor.get_plan(document, query_hash, operation_name)
+        )
+        exe_context = None
+        if plan is not None and plan.scalar_only:
+            exe_context = executor.build_context(
+                document, variables, operation_name, context_value, root_value
+            )
+
+        if exe_context is None or isinstance(exe_context, list):
+            result = await executor.execute(
+                query,
+                variables=variables,
+                operation_name=operation_name,
+                context_value=context_value,
+                root_value=root_value,
+                query_hash=query_hash,
+            )
+            fp.write(self.dumps(get_formatted_result(result)))
+            return
+
+        state = plan.start(exe_context)
+        try:
+            entities = await plan.resolve(state)
+        except Exception as error:
+            fp.write(
+                self.dumps(get_formatted_result(plan.build_error_result(state, error)))
+            )
+            return
+
+        if isinstance(entities, (str, bytes, dict, Iterator)) or not hasattr(
+            entities, "__iter__"
+        ):
+            # No field resolved yet: `null` or an invalid value reported by graphql-core
+            data = await plan.complete_with_graphql(state, entities)
+            fp.write(self.dumps(get_formatted_result(plan.build_result(state, data))))
+            return
+
+        await self.write_entities(fp, plan, state, entities)
+
+    async def write_entities(
+        self, fp: TextIO, plan: EntitiesPlan, state: ExecutionState, entities: Any
+    ):
+        item_plan = plan.plan.value_plan.item_plan
+        fp.write('{"data":{%s[' % plan.plan.json_key)
+        for i, entity in enumerate(entities):
+            chunks = [","] if i else []
+            if entity is None:
+                chunks.append("null")
+            else:
+                try:
+                    object_plan = get_object_plan(item_plan, entity, state)
+                    write_object(object_plan, entity, state, chunks)
+                except Exception:
+                    data = await plan.complete_entity_with_graphql(state, i, entity)
+                    chunks = [",", self.dumps(data)] if i else [self.dumps(data)]
+            fp.write("".join(chunks))
+        fp.write("]}")
+
+        errors = get_execution_errors(state.exe_context)
+        if errors:
+            fp.write(',"errors":%s' % self.dumps([error.formatted for error in errors]))
+        fp.write("}")
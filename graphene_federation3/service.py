@@ -1,13 +1,14 @@
 import re
-from typing import List
+from typing import Dict, Optional, Tuple
 
 from graphene import Field, ObjectType, Schema, String
 
 from graphene_federation3.extend import get_extended_types
 from graphene_federation3.provides import get_provides_parent_types
 from .entity import get_entities
+from .field_set import FieldSet, get_field_sets, iter_decorated_fields
 from .graphql_compatibility import call_schema_get_type, call_schema_print_fields
-from .utils import field_name_to_type_attribute, type_attribute_to_field_name
+from .utils import type_attribute_to_field_name
 
 
 class MonoFieldType:
@@ -20,25 +21,26 @@ class MonoFieldType:
         self.fields = {name: field}
 
 
-def convert_fields(schema: Schema, fields: List[str]) -> str:
-    get_field_name = type_attribute_to_field_name(schema)
-    return " ".join([get_field_name(field) for field in fields])
-
-
 DECORATORS = {
-    "_external": lambda _schema, _fields: "@external",
-    "_requires": lambda schema, fields: f'@requires(fields: "{convert_fields(schema, fields)}")',
-    "_provides": lambda schema, fields: f'@provides(fields: "{convert_fields(schema, fields)}")',
+    "_external": lambda _field_set: "@external",
+    "_requires": lambda field_set: f'@requires(fields: "{field_set}")',
+    "_provides": lambda field_set: f'@provides(fields: "{field_set}")',
 }
 
 
-def add_entity_fields_decorators(entity, schema: Schema, string_schema: str) -> str:
+def add_entity_fields_decorators(
+    entity,
+    schema: Schema,
+    string_schema: str,
+    field_sets: Dict[str, Dict[Tuple[str, str], FieldSet]],
+) -> str:
     """
     For a given entity, go through all its field and see if any directive decorator need to be added.
     The methods (from graphene-federation) marking fields that require some special treatment for federation add
     corresponding attributes to the field itself.
     Those attributes are listed in the `DECORATORS` variable as key and their respective value is the resolver that
     returns what needs to be amended to the field declaration.
+    The `@requires` and `@provides` fields are printed from their field sets parsed by `get_field_sets`.
 
     This method simply go through the field that need to be modified and replace them with their annotated version in the
     schema string representation.
@@ -47,24 +49,18 @@ def add_entity_fields_decorators(entity, schema: Schema, string_schema: str) ->
     # old entity_type = schema.get_type(entity_name)
     entity_type = call_schema_get_type(schema, entity_name)
     str_fields = []
-    get_model_attr = field_name_to_type_attribute(schema, entity)
-    for field_name, field in entity_type.fields.items():
+    for field_name, field, f in iter_decorated_fields(schema, entity_type):
         str_field = call_schema_print_fields(schema, MonoFieldType(field_name, field))
-        model_attr = get_model_attr(field_name)
         # Check if we need to annotate the field by checking if it has the decorator attribute set on the field.
-        f = getattr(entity, model_attr, None)
-
-        if f is None:
-            for k, v in entity._meta.fields.items():
-                if getattr(v, "name", None) == model_attr:
-                    f = getattr(entity, k, None)
-                    break
-
         if f is not None:
             for decorator, decorator_resolver in DECORATORS.items():
                 decorator_value = getattr(f, decorator, None)
                 if decorator_value:
-                    str_field += f" {decorator_resolver(schema, decorator_value)}"
+                    if decorator in field_sets:
+                        decorator_value = field_sets[decorator][
+                            (entity_name, field_name)
+                        ]
+                    str_field += f" {decorator_resolver(decorator_value)}"
         str_fields.append(str_field)
     str_fields_annotated = "\n".join(str_fields)
     # Replace the original field declaration by the annotated one
@@ -76,10 +72,15 @@ def add_entity_fields_decorators(entity, schema: Schema, string_schema: str) ->
     return string_schema
 
 
-def get_sdl(schema: Schema) -> str:
+def get_sdl(
+    schema: Schema,
+    field_sets: Optional[Dict[str, Dict[Tuple[str, str], FieldSet]]] = None,
+) -> str:
     """
     Add all needed decorators to the string representation of the schema.
     """
+    if field_sets is None:
+        field_sets = get_field_sets(schema)
     string_schema = str(schema)
 
     string_schema = re.sub(r"schema \{[\w\s:!]*\}", " ", string_schema)
@@ -91,7 +92,9 @@ def get_sdl(schema: Schema) -> str:
 
     # Add fields directives (@external, @provides, @requires)
     for entity in set(provides_parent_types.values()) | set(extended_types.values()):
-        string_schema = add_entity_fields_decorators(entity, schema, string_schema)
+        string_schema = add_entity_fields_decorators(
+            entity, schema, string_schema, field_sets
+        )
 
     # Prepend `extend` keyword to the type definition of extended types
     for entity_name, entity in extended_types.items():
@@ -112,8 +115,11 @@ def get_sdl(schema: Schema) -> str:
     return string_schema
 
 
-def get_service_query(schema: Schema):
-    sdl_str = get_sdl(schema)
+def get_service_query(
+    schema: Schema,
+    field_sets: Optional[Dict[str, Dict[Tuple[str, str], FieldSet]]] = None,
+):
+    sdl_str = get_sdl(schema, field_sets)
 
     class _Service(ObjectType):
         sdl = String()
@@ -0,0 +1,67 @@
+"""
+Lightweight instances of the entity types resolved without any reference resolver.
+
+An entity type without `__resolve_reference` (typically an `@extend` type whose fields are resolved from its key)
+is resolved by instantiating it with the fields of each representation. With `build_schema(..., entity_stubs=True)`,
+`resolve_entities` builds a stub instead of a full graphene `ObjectType` instance: an instance of a `__slots__` class
+holding the fields of the type (with fewer allocations) and sharing its class attributes (methods, constants...),
+so that its field resolvers work unchanged.
+Stubs are not instances of the type though: its resolvers must not rely on `isinstance` checks nor on zero-argument
+`super()` calls.
+"""
+from typing import Any, Callable, Dict, Tuple
+
+from graphene import ObjectType
+
+
+def get_type_namespace(model) -> Dict[str, Any]:
+    """
+    Return the class attributes defined on the type (and its own bases): methods, properties, constants...
+    Only the graphene internals (`_meta`, the fields) and the dunder attributes are left out.
+    """
+    namespace = {}
+    for base in reversed(model.__mro__):
+        if base in ObjectType.__mro__:
+            continue
+        for name, value in vars(base).items():
+            if name.startswith("__") or name == "_meta" or name in model._meta.fields:
+                continue
+            namespace[name] = value
+    return namespace
+
+
+def get_init(fields: Tuple[str, ...]) -> Callable:
+    """
+    Generate the `__init__` of a stub class, setting all the fields (to `None` by default) like the dataclass
+    `__init__` of graphene types.
+    """
+    arguments = "".join(f", {name}=None" for name in fields)
+    body = "".join(f"\n    self.{name} = {name}" for name in fields) or "\n    pass"
+    namespace: Dict[str, Any] = {}
+    exec(f"def __init__(self, *{arguments}):{body}", namespace)
+    return namespace["__init__"]
+
+
+def get_entity_stub_cls(model) -> type:
+    """
+    Create the stub class of an entity type, see the module documentation.
+    Stubs are resolved to their entity type by the `_Entity` union (`_entity_type` attribute).
+    """
+    fields = tuple(model._meta.fields)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in fields)
+        return f"{model.__name__}({values})"
+
+    namespace = {
+        **get_type_namespace(model),
+        "__slots__": fields,
+        "__init__": get_init(fields),
+        "__repr__": __repr__,
+        "__module__": model.__module__,
+        "__qualname__": model.__qualname__,
+        "_entity_type": model,
+        "_meta": model._meta,
+    }
+    # Named after the type, like `self.__class__.__name__` in resolvers expects
+    return type(model.__name__, (), namespace)
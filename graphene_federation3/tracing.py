@@ -0,0 +1,203 @@
+"""
+Federated tracing (FTV1) support.
+See specification: https://www.apollographql.com/docs/federation/metrics/
+
+When the gateway sends the `apollo-federation-include-trace: ftv1` header, the operation should be executed
+with a `FederatedTracingMiddleware`, which records the start and end time of every resolver (`_entities` included)
+and encodes them as a base64 `Trace` protobuf message in the `ftv1` extension of the response.
+Nothing is recorded (and no middleware is installed) for the requests not asking for it.
+"""
+import json
+from base64 import b64encode
+from inspect import isawaitable
+from time import perf_counter_ns, time_ns
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from graphql import ExecutionResult, GraphQLResolveInfo
+from graphql.language import get_location
+
+FTV1_HEADER = "apollo-federation-include-trace"
+FTV1_EXTENSION = "ftv1"
+
+
+def should_trace(headers: Mapping[str, str]) -> bool:
+    """
+    Check whether the gateway asked for a federated trace, given the (lower cased) request headers.
+    """
+    return headers.get(FTV1_HEADER) == FTV1_EXTENSION
+
+
+def _varint(value: int) -> bytes:
+    data = bytearray()
+    while value > 0x7F:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def _varint_field(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+
+def _bytes_field(number: int, value: Union[bytes, str]) -> bytes:
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return _varint(number << 3 | 2) + _varint(len(value)) + value
+
+
+def _timestamp(ns: int) -> bytes:
+    seconds, nanos = divmod(ns, 1_000_000_000)
+    return _varint_field(1, seconds) + _varint_field(2, nanos)
+
+
+class TraceError:
+    __slots__ = ("message", "location", "json")
+
+    def __init__(self, error: Exception, info: GraphQLResolveInfo):
+        self.message = str(error)
+        self.location: Optional[Tuple[int, int]] = None
+        loc = info.field_nodes[0].loc if info.field_nodes else None
+        if loc is not None:
+            location = get_location(loc.source, loc.start)
+            self.location = (location.line, location.column)
+        self.json = json.dumps({"message": self.message, "path": info.path.as_list()})
+
+    def encode(self) -> bytes:
+        data = _bytes_field(1, self.message)
+        if self.location:
+            line, column = self.location
+            data += _bytes_field(2, _varint_field(1, line) + _varint_field(2, column))
+        return data + _bytes_field(4, self.json)
+
+
+class TraceNode:
+    """
+    A node of the trace tree: either a field (identified by its response name) or a list item (by its index).
+    """
+
+    __slots__ = (
+        "response_name",
+        "index",
+        "original_field_name",
+        "type",
+        "parent_type",
+        "start_time",
+        "end_time",
+        "errors",
+        "children",
+    )
+
+    def __init__(self, key: Union[str, int, None] = None):
+        self.response_name = key if isinstance(key, str) else None
+        self.index = key if isinstance(key, int) else None
+        self.original_field_name: Optional[str] = None
+        self.type: Optional[str] = None
+        self.parent_type: Optional[str] = None
+        self.start_time = 0
+        self.end_time = 0
+        self.errors: List[TraceError] = []
+        self.children: List["TraceNode"] = []
+
+    def encode(self) -> bytes:
+        data = b""
+        if self.response_name is not None:
+            data += _bytes_field(1, self.response_name)
+        if self.index is not None:
+            data += _varint_field(2, self.index)
+        if self.type:
+            data += _bytes_field(3, self.type)
+        if self.start_time:
+            data += _varint_field(8, self.start_time)
+        if self.end_time:
+            data += _varint_field(9, self.end_time)
+        for error in self.errors:
+            data += _bytes_field(11, error.encode())
+        for child in self.children:
+            data += _bytes_field(12, child.encode())
+        if self.parent_type:
+            data += _bytes_field(13, self.parent_type)
+        if self.original_field_name:
+            data += _bytes_field(14, self.original_field_name)
+        return data
+
+
+class FederatedTracingMiddleware:
+    """
+    graphql-core middleware recording the resolvers timings of one operation, e.g.:
+
+        tracer = FederatedTracingMiddleware()
+        result = await schema.execute_async(query, variables=variables, middleware=[tracer])
+        tracer.add_to_result(result)
+
+    A new instance must be used for each operation.
+    """
+
+    def __init__(self):
+        self.start_time = time_ns()
+        self.end_time: Optional[int] = None
+        self._start = perf_counter_ns()
+        self.root = TraceNode()
+        self._nodes: Dict[Tuple[Union[str, int], ...], TraceNode] = {(): self.root}
+
+    def _get_node(self, path: Tuple[Union[str, int], ...]) -> TraceNode:
+        node = self._nodes.get(path)
+        if node is None:
+            node = self._nodes[path] = TraceNode(path[-1])
+            self._get_node(path[:-1]).children.append(node)
+        return node
+
+    def resolve(self, next_, root, info: GraphQLResolveInfo, **args):
+        node = self._get_node(tuple(info.path.as_list()))
+        if node.response_name != info.field_name:
+            node.original_field_name = info.field_name
+        node.type = str(info.return_type)
+        node.parent_type = str(info.parent_type)
+        node.start_time = perf_counter_ns() - self._start
+
+        try:
+            result = next_(root, info, **args)
+        except Exception as e:
+            node.errors.append(TraceError(e, info))
+            node.end_time = perf_counter_ns() - self._start
+            raise
+
+        if isawaitable(result):
+            return self._await_result(node, info, result)
+
+        node.end_time = perf_counter_ns() - self._start
+        return result
+
+    async def _await_result(self, node: TraceNode, info: GraphQLResolveInfo, result):
+        try:
+            return await result
+        except Exception as e:
+            node.errors.append(TraceError(e, info))
+            raise
+        finally:
+            node.end_time = perf_counter_ns() - self._start
+
+    def finish(self):
+        if self.end_time is None:
+            self.end_time = self.start_time + perf_counter_ns() - self._start
+
+    def encode(self) -> bytes:
+        """
+        Encode the trace as a `Trace` protobuf message.
+        """
+        self.finish()
+        return (
+            _bytes_field(3, _timestamp(self.end_time))
+            + _bytes_field(4, _timestamp(self.start_time))
+            + _varint_field(11, self.end_time - self.start_time)
+            + _bytes_field(14, self.root.encode())
+        )
+
+    def add_to_result(self, result: ExecutionResult) -> ExecutionResult:
+        """
+        Add the encoded trace to the `ftv1` extension of the execution result.
+        """
+        extensions: Dict[str, Any] = dict(result.extensions or {})
+        extensions[FTV1_EXTENSION] = b64encode(self.encode()).decode("ascii")
+        result.extensions = extensions
+        return result
@@ -1,8 +1,11 @@
-from typing import Any, Callable
+import json
+from base64 import b64decode
+from typing import Any, Callable, List
 
 import graphene
 from graphene import Schema
 from graphene.utils.str_converters import to_camel_case
+from graphql_relay import from_global_id
 
 from graphene_federation3 import graphql_compatibility
 
@@ -32,6 +35,52 @@ def type_attribute_to_field_name(schema: Schema) -> Callable[[str], str]:
         return lambda attr_name: attr_name
 
 
+def is_global_id_field(model: Any, attr_name: str) -> bool:
+    """
+    Check whether the given graphene_type attribute is an `ID` field, whose values are sent as global ids.
+    """
+    return isinstance(getattr(model, attr_name, None), graphene.types.ID)
+
+
+def decode_global_id(schema_name: str, global_id: str) -> Any:
+    """
+    Decode a global id of the given type to the native key value it wraps.
+    """
+    global_id = from_global_id(global_id)
+
+    assert (
+        global_id.type == schema_name
+    ), f"Invalid global id type: {schema_name} != {global_id.type}"
+
+    return json.loads(global_id.id)
+
+
+def decode_global_ids(schema_name: str, global_ids: List[str]) -> List[Any]:
+    """
+    Decode the global ids of a group of representations of the given type, like `decode_global_id`.
+    The type prefix is checked once on all the decoded ids, and the integer ids (the most common) are parsed
+    without `json.loads`.
+    An invalid global id is reported by `decode_global_id`.
+    """
+    prefix = f"{schema_name}:".encode()
+    size = len(prefix)
+    try:
+        decoded = [b64decode(global_id) for global_id in global_ids]
+    except (TypeError, ValueError):
+        decoded = None
+    if decoded is None or any(value[:size] != prefix for value in decoded):
+        return [decode_global_id(schema_name, global_id) for global_id in global_ids]
+
+    keys = []
+    for value in decoded:
+        value = value[size:]
+        if value.isdigit() and (value[:1] != b"0" or len(value) == 1):
+            keys.append(int(value))
+        else:
+            keys.append(json.loads(value))
+    return keys
+
+
 def get_data_for_id_filter_from_representations(
     object_type: graphene.Field, representations: list
 ):
@@ -40,7 +89,15 @@ def get_data_for_id_filter_from_representations(
 
 
 def get_model_key(object_type, representation):
-    if getattr(object_type, "_keys", None):
+    """
+    Return the key field of the representation: the cheapest key (see `key(cost=...)`) it carries.
+    """
+    key_fields = getattr(object_type, "_key_fields", None)
+    if key_fields is not None:
+        for key in key_fields:
+            if key in representation:
+                return key
+    elif getattr(object_type, "_keys", None):
         keys = getattr(object_type, "_keys")
         for key in keys:
             key = to_camel_case(key)
@@ -1,15 +1,9 @@
 import uvicorn as uvicorn
-from fastapi import FastAPI
-from starlette_graphene3 import (
-    GraphQLApp,
-    make_graphiql_handler,
-)
 
+from graphene_federation3.asgi import create_app
 from schema import schema
 
-app = FastAPI()
-
-app.add_route("/graphql", GraphQLApp(schema=schema, on_get=make_graphiql_handler()))
+app = create_app(schema)
 
 if __name__ == "__main__":
     uvicorn.run(
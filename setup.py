@@ -31,6 +31,7 @@ setup(
     url="https://gitlab.com/live-art-project/graphene-federation3",
     keywords=["graphene", "gql", "federation"],
     install_requires=["graphene>=3", "graphql-core>=3.1.0"],
+    extras_require={"asgi": ["orjson"]},
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Developers",
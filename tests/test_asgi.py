@@ -0,0 +1,267 @@
+import gzip
+import json
+from base64 import b64decode
+from urllib.parse import urlencode
+
+import pytest
+from graphene import Field, ID, ObjectType, String
+from graphql_relay import to_global_id
+
+from graphene_federation3 import build_schema, key
+from graphene_federation3.asgi import accepts_gzip, create_app
+
+
+def get_schema():
+    @key("id")
+    class Product(ObjectType):
+        id = ID(required=True)
+        name = String()
+
+        def resolve_name(self, info):
+            return f"product_{self.id}"
+
+    class Query(ObjectType):
+        product = Field(Product)
+
+    return build_schema(query=Query)
+
+
+async def call(
+    app, method="POST", path="/graphql", body=None, headers=None, query_string=b""
+):
+    body = json.dumps(body).encode() if body is not None else b""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query_string,
+        "headers": [(k.encode(), v.encode()) for k, v in (headers or {}).items()],
+    }
+    await app(scope, receive, send)
+    start, response = sent
+    response_headers = dict(start["headers"])
+    content = response["body"]
+    if response_headers.get(b"content-encoding") == b"gzip":
+        content = gzip.decompress(content)
+    return start["status"], response_headers, json.loads(content)
+
+
+ENTITIES_QUERY = """
+query ($representations: [_Any]) {
+  _entities(representations: $representations) {
+    ... on Product {
+      name
+    }
+  }
+}
+"""
+
+
+def get_variables(count):
+    return {
+        "representations": [
+            {"__typename": "Product", "id": to_global_id("Product", i)}
+            for i in range(count)
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_entities():
+    app = create_app(get_schema())
+
+    status, headers, response = await call(
+        app, body={"query": ENTITIES_QUERY, "variables": get_variables(2)}
+    )
+    assert status == 200
+    assert b"content-encoding" not in headers
+    assert response == {
+        "data": {"_entities": [{"name": "product_0"}, {"name": "product_1"}]}
+    }
+
+
+@pytest.mark.asyncio
+async def test_gzip_large_responses():
+    app = create_app(get_schema(), gzip_min_size=100)
+
+    status, headers, response = await call(
+        app,
+        body={"query": ENTITIES_QUERY, "variables": get_variables(20)},
+        headers={"Accept-Encoding": "gzip, deflate"},
+    )
+    assert status == 200
+    assert headers[b"content-encoding"] == b"gzip"
+    assert len(response["data"]["_entities"]) == 20
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,accepted",
+    [
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("GZIP; q=1.0", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip;q=0, *", False),
+        ("br, *;q=0", False),
+        ("identity", False),
+        ("", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding, accepted):
+    assert accepts_gzip(accept_encoding) is accepted
+
+
+@pytest.mark.asyncio
+async def test_service_response_is_cached():
+    app = create_app(get_schema())
+    query = "query { _service { sdl } }"
+
+    status, _, response = await call(app, body={"query": query})
+    assert status == 200
+    assert "Product" in response["data"]["_service"]["sdl"]
+    lookups = app.documents.hits + app.documents.misses
+
+    assert await call(app, body={"query": query}) == (status, _, response)
+    assert app.documents.hits + app.documents.misses == lookups
+    assert len(app._service_responses) == 1
+
+    # Not for the operations asking for a trace
+    _, _, traced = await call(
+        app, body={"query": query}, headers={"apollo-federation-include-trace": "ftv1"}
+    )
+    assert traced["data"] == response["data"]
+    assert "ftv1" in traced["extensions"]
+
+
+@pytest.mark.asyncio
+async def test_ftv1():
+    app = create_app(get_schema())
+
+    status, _, response = await call(
+        app,
+        body={"query": ENTITIES_QUERY, "variables": get_variables(1)},
+        headers={"apollo-federation-include-trace": "ftv1"},
+    )
+    assert status == 200
+    assert b"_entities" in b64decode(response["extensions"]["ftv1"])
+
+
+@pytest.mark.asyncio
+async def test_health_and_errors():
+    app = create_app(get_schema())
+
+    assert (await call(app, method="GET", path="/health"))[0] == 200
+    assert (await call(app, method="GET", path="/ready"))[0] == 200
+    assert (await call(app, path="/unknown", body={}))[0] == 404
+    assert (await call(app, body={"variables": {}}))[0] == 400
+    assert (await call(app, method="PUT", body={}))[0] == 400
+    status, _, response = await call(
+        app, body={"query": "{ __typename }", "variables": [1]}
+    )
+    assert status == 400
+    assert (
+        response["errors"][0]["message"] == "The operation variables must be an object"
+    )
+
+    status, _, response = await call(app, body={"query": "{ unknown }"})
+    assert status == 200
+    assert response["errors"]
+
+
+@pytest.mark.asyncio
+async def test_get_requests_only_execute_queries():
+    class Mutation(ObjectType):
+        touch = String()
+
+        def resolve_touch(root, info):
+            calls.append(info.field_name)
+            return "touched"
+
+    calls = []
+    app = create_app(build_schema(query=get_schema().query, mutation=Mutation))
+
+    status, _, response = await call(
+        app, method="GET", query_string=urlencode({"query": "{ __typename }"}).encode()
+    )
+    assert status == 200
+    assert response == {"data": {"__typename": "Query"}}
+
+    status, headers, response = await call(
+        app,
+        method="GET",
+        query_string=urlencode({"query": "mutation { touch }"}).encode(),
+    )
+    assert status == 405
+    assert headers[b"allow"] == b"POST"
+    assert response["errors"]
+    assert calls == []
+
+    status, _, response = await call(app, body={"query": "mutation { touch }"})
+    assert status == 200
+    assert response == {"data": {"touch": "touched"}}
+
+
+@pytest.mark.asyncio
+async def test_batched_operations_share_entity_loader():
+    calls = []
+
+    @key("id")
+    class Product(ObjectType):
+        id = ID(required=True)
+        name = String()
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            calls.append(sorted(values))
+            return {v: Product(id=v, name=f"product_{v}") for v in values}
+
+    class Query(ObjectType):
+        product = Field(Product)
+
+    app = create_app(build_schema(query=Query))
+
+    status, _, response = await call(
+        app,
+        body=[
+            {"query": ENTITIES_QUERY, "variables": get_variables(2)},
+            {"query": ENTITIES_QUERY, "variables": get_variables(3)},
+            {"query": "{ _service { sdl } }"},
+            {"variables": {}},
+        ],
+    )
+    assert status == 200
+    assert response[0] == {
+        "data": {"_entities": [{"name": "product_0"}, {"name": "product_1"}]}
+    }
+    assert response[1] == {
+        "data": {
+            "_entities": [
+                {"name": "product_0"},
+                {"name": "product_1"},
+                {"name": "product_2"},
+            ]
+        }
+    }
+    assert "Product" in response[2]["data"]["_service"]["sdl"]
+    assert response[3]["errors"]
+    assert calls == [[0, 1, 2]]
+
+
+@pytest.mark.asyncio
+async def test_batch_size_limit():
+    app = create_app(get_schema(), max_batch_size=1)
+
+    status, _, response = await call(
+        app, body=[{"query": "{ __typename }"}, {"query": "{ __typename }"}]
+    )
+    assert status == 400
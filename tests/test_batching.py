@@ -0,0 +1,302 @@
+import enum
+
+import pytest
+from graphene import Context, Enum, Field, ID, Int, List, ObjectType, String
+from graphql import graphql
+from graphql_relay import to_global_id
+
+from graphene_federation3 import (
+    batched,
+    build_schema,
+    extend,
+    external,
+    get_required_fields,
+    key,
+    requires,
+)
+
+
+class UnitEnum(enum.Enum):
+    KG = "kg"
+    LB = "lb"
+
+
+Unit = Enum.from_enum(UnitEnum)
+
+
+class Dimensions(ObjectType):
+    height = external(Int())
+    width = external(Int())
+
+
+QUERY = """
+query ($representations: [_Any]) {
+  _entities(representations: $representations) {
+    ... on Product {
+      shippingEstimate
+    }
+  }
+}
+"""
+
+
+def get_representations(count, **fields):
+    return [
+        {
+            "__typename": "Product",
+            "sku": to_global_id("Product", i),
+            "weight": i,
+            **{name: value(i) for name, value in fields.items()},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_required_fields_are_parsed():
+    @extend("sku")
+    class Product(ObjectType):
+        sku = external(ID())
+        weight = external(Int())
+        unit = external(Field(Unit))
+        dimensions = external(Field(Dimensions))
+        shipping_estimate = requires(
+            String(), fields="weight unit dimensions { height width }"
+        )
+
+        def resolve_shipping_estimate(self, info):
+            required = get_required_fields(self, info)
+            assert required["unit"] is UnitEnum.LB
+            dimensions = required["dimensions"]
+            return f"{required['weight']} {dimensions['height']}x{dimensions['width']}"
+
+    class Query(ObjectType):
+        product = Field(Product)
+
+    schema = build_schema(query=Query)
+    result = await graphql(
+        schema.graphql_schema,
+        QUERY,
+        context_value=Context(),
+        variable_values={
+            "representations": get_representations(
+                2,
+                unit=lambda i: "LB",
+                dimensions=lambda i: {"height": i, "width": 2 * i},
+            )
+        },
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [{"shippingEstimate": "0 0x0"}, {"shippingEstimate": "1 1x2"}]
+    }
+
+
+@pytest.mark.asyncio
+async def test_batched_requires_resolver():
+    calls = []
+
+    @extend("sku")
+    class Product(ObjectType):
+        sku = external(ID())
+        weight = external(Int())
+        shipping_estimate = requires(String(), fields="weight", batched=True)
+
+        @staticmethod
+        async def resolve_shipping_estimate(products, info):
+            calls.append(len(products))
+            return [
+                f"estimate_{get_required_fields(product, info).get('weight')}"
+                for product in products
+            ]
+
+    class Query(ObjectType):
+        products = List(Product)
+
+        def resolve_products(root, info):
+            return [Product(sku="a"), Product(sku="b")]
+
+    schema = build_schema(query=Query)
+    representations = get_representations(3)
+    result = await graphql(
+        schema.graphql_schema,
+        QUERY,
+        context_value=Context(),
+        # The duplicated representation resolves to the same entity
+        variable_values={"representations": representations + representations[:1]},
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [
+            {"shippingEstimate": "estimate_0"},
+            {"shippingEstimate": "estimate_1"},
+            {"shippingEstimate": "estimate_2"},
+            {"shippingEstimate": "estimate_0"},
+        ]
+    }
+    assert calls == [3]
+
+    # Outside of `_entities` the batched resolver is called for each entity
+    result = await graphql(
+        schema.graphql_schema,
+        "{ products { shippingEstimate } }",
+        context_value=Context(),
+    )
+    assert not result.errors
+    assert result.data == {
+        "products": [
+            {"shippingEstimate": "estimate_None"},
+            {"shippingEstimate": "estimate_None"},
+        ]
+    }
+    assert calls == [3, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_batched_resolver_error():
+    @extend("sku")
+    class Product(ObjectType):
+        sku = external(ID())
+        weight = external(Int())
+        shipping_estimate = requires(String(), fields="weight", batched=True)
+
+        @staticmethod
+        def resolve_shipping_estimate(products, info):
+            raise ValueError("Unavailable")
+
+    class Query(ObjectType):
+        product = Field(Product)
+
+    schema = build_schema(query=Query)
+    result = await graphql(
+        schema.graphql_schema,
+        QUERY,
+        context_value=Context(),
+        variable_values={"representations": get_representations(2)},
+    )
+    assert [error.message for error in result.errors] == ["Unavailable"] * 2
+    assert result.data == {
+        "_entities": [{"shippingEstimate": None}, {"shippingEstimate": None}]
+    }
+
+
+@pytest.mark.asyncio
+async def test_batched_field_resolver():
+    calls = []
+
+    class Review(ObjectType):
+        body = String()
+
+    @key("id")
+    class User(ObjectType):
+        id = ID(required=True)
+        reviews = List(Review, first=Int())
+
+        @classmethod
+        def _resolve_references(cls, info, key, values):
+            return {value: User(id=value) for value in values}
+
+        @batched
+        def resolve_reviews(users, info, first=2):
+            calls.append(([user.id for user in users], first))
+            return [
+                [Review(body=f"review_{user.id}_{i}") for i in range(first)]
+                for user in users
+            ]
+
+    class Query(ObjectType):
+        user = Field(User)
+
+    schema = build_schema(query=Query)
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              reviews { body }
+              last: reviews(first: 1) { body }
+            }
+          }
+        }
+        """,
+        context_value=Context(),
+        variable_values={
+            "representations": [
+                {"__typename": "User", "id": to_global_id("User", i)} for i in range(3)
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data["_entities"][1] == {
+        "reviews": [{"body": "review_1_0"}, {"body": "review_1_1"}],
+        "last": [{"body": "review_1_0"}],
+    }
+    assert calls == [([0, 1, 2], 2), ([0, 1, 2], 1)]
+
+
+@pytest.mark.asyncio
+async def test_batched_resolver_with_cached_entities():
+    calls = []
+
+    @key("id")
+    class User(ObjectType):
+        id = ID(required=True)
+        score = Int()
+
+        @classmethod
+        def _resolve_references(cls, info, key, values):
+            return {value: USERS[value] for value in values}
+
+        @batched
+        def resolve_score(users, info):
+            calls.append(len(users))
+            return [len(calls)] * len(users)
+
+    # Instances shared between the requests
+    USERS = {i: User(id=i) for i in range(2)}
+
+    class Query(ObjectType):
+        user = Field(User)
+
+        def resolve_user(root, info):
+            return USERS[0]
+
+    schema = build_schema(query=Query)
+    entities_query = """
+    query ($representations: [_Any]) {
+      _entities(representations: $representations) {
+        ... on User {
+          score
+        }
+      }
+    }
+    """
+    representations = [
+        {"__typename": "User", "id": to_global_id("User", i)} for i in range(2)
+    ]
+
+    async def query_entities():
+        result = await graphql(
+            schema.graphql_schema,
+            entities_query,
+            context_value=Context(),
+            variable_values={"representations": representations},
+        )
+        assert not result.errors
+        return result.data["_entities"]
+
+    async def query_user():
+        result = await graphql(
+            schema.graphql_schema, "{ user { score } }", context_value=Context()
+        )
+        assert not result.errors
+        return result.data["user"]
+
+    assert await query_entities() == [{"score": 1}, {"score": 1}]
+    # The entity group of the previous request is neither reused nor kept on the entities
+    assert await query_user() == {"score": 2}
+    assert await query_user() == {"score": 3}
+    assert await query_entities() == [{"score": 4}, {"score": 4}]
+    assert calls == [2, 1, 1, 2]
+    assert all(not hasattr(user, "_entity_group") for user in USERS.values())
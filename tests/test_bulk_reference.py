@@ -1,10 +1,17 @@
+import asyncio
+from array import array
+from collections import namedtuple
+from dataclasses import dataclass
+
 import graphene
 import pytest
 from graphene import Connection, Context, ObjectType, String, relay
 from graphql import graphql
 from graphql_relay import to_global_id
 
+from graphene_federation3.columnar import ColumnarBatch
 from graphene_federation3.entity import key
+from graphene_federation3.loader import EntityLoader
 from graphene_federation3.main import build_schema
 
 _query = """
@@ -264,3 +271,747 @@ async def test_second_key(raise_graphql):
             {"emailField": "identifier@email.com", "id": "VXNlcjppZGVudGlmaWVy"}
         ]
     }
+
+
+@pytest.mark.asyncio
+async def test_resolve_references_mapping(raise_graphql):
+    calls = []
+
+    @key("identifier")
+    class User(ObjectType):
+        identifier = graphene.ID()
+        email_field = String()
+
+        def resolve_identifier(self, info):
+            return to_global_id(self.__class__.__name__, self.identifier)
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            calls.append((key, values))
+            return {v: User(identifier=v, email_field=f"{v}@email.com") for v in values}
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              emailField
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "identifier": to_global_id("User", "1")},
+                {"__typename": "User", "identifier": to_global_id("User", "2")},
+                {"__typename": "User", "identifier": to_global_id("User", "1")},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [
+            {"emailField": "1@email.com"},
+            {"emailField": "2@email.com"},
+            {"emailField": "1@email.com"},
+        ]
+    }
+    assert calls == [("identifier", [1, 2])]
+
+
+@pytest.mark.asyncio
+async def test_resolve_references_iterable(raise_graphql):
+    @key("email_field")
+    class User(ObjectType):
+        email_field = String()
+        name = String()
+
+        @classmethod
+        async def _resolve_references(cls, info, key, values):
+            assert key == "email_field"
+            return [User(email_field=v, name=v.split("@")[0]) for v in values]
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              name
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "emailField": "a@email.com"},
+                {"__typename": "User", "emailField": "b@email.com"},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"name": "a"}, {"name": "b"}]}
+
+
+@pytest.mark.asyncio
+async def test_resolve_references_iterable_with_id_key(raise_graphql):
+    @key("id")
+    class User(ObjectType):
+        id = graphene.ID(required=True)
+        name = String()
+
+        @classmethod
+        def _resolve_references(cls, info, key, values):
+            assert values == [1, 2]
+            return [User(id=v, name=f"user_{v}") for v in reversed(values)]
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              name
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "id": to_global_id("User", 1)},
+                {"__typename": "User", "id": to_global_id("User", 2)},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"name": "user_1"}, {"name": "user_2"}]}
+
+
+@pytest.mark.asyncio
+async def test_key_resolver_shares_info(raise_graphql):
+    key_infos = []
+
+    @key("email_field")
+    class User(ObjectType):
+        email_field = String()
+
+        def resolve_email_field(self, info):
+            key_infos.append(info)
+            return self.email_field
+
+        @classmethod
+        def _resolve_references(cls, info, key, values):
+            return [User(email_field=v) for v in values]
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            __typename
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "emailField": "a@email.com"},
+                {"__typename": "User", "emailField": "b@email.com"},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"__typename": "User"}] * 2}
+    assert len(key_infos) == 2
+    assert key_infos[0] is key_infos[1]
+
+
+_email_query = """
+query ($representations: [_Any]) {
+  _entities(representations: $representations) {
+    ... on User {
+      emailField
+      name
+    }
+  }
+}
+"""
+
+_email_representations = [
+    {"__typename": "User", "emailField": "a@email.com"},
+    {"__typename": "User", "emailField": "b@email.com"},
+]
+
+
+def _get_email_values(info):
+    (argument,) = info.field_nodes[0].arguments
+    assert argument.name.value == "emailField_In"
+    return [v.value for v in argument.value.values]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("result_type", ["list", "mapping", "async_iterator"])
+async def test_bulk_plain_results(raise_graphql, result_type):
+    @key("email_field")
+    class User(ObjectType):
+        email_field = String()
+        name = String()
+
+        @classmethod
+        def _resolve_reference_bulk(cls, model, info):
+            users = [
+                User(email_field=v, name=v.split("@")[0])
+                for v in _get_email_values(info)
+            ]
+            if result_type == "mapping":
+                return {user.email_field: user for user in users}
+            if result_type == "async_iterator":
+
+                async def stream():
+                    for user in users:
+                        yield user
+
+                return stream()
+            return users
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+
+    result = await graphql(
+        schema.graphql_schema,
+        _email_query,
+        variable_values={"representations": _email_representations},
+        context_value=Context(),
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [
+            {"emailField": "a@email.com", "name": "a"},
+            {"emailField": "b@email.com", "name": "b"},
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_async_iterator_results_are_indexed_as_they_arrive(raise_graphql):
+    events = []
+
+    @key("email_field")
+    class User(ObjectType):
+        email_field = String()
+
+        def resolve_email_field(self, info):
+            events.append(("key", self.email_field))
+            return self.email_field
+
+        @classmethod
+        def _resolve_references(cls, info, key, values):
+            async def stream():
+                for value in values:
+                    events.append(("row", value))
+                    yield User(email_field=value)
+
+            return stream()
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+    result = await graphql(
+        schema.graphql_schema,
+        "query ($r: [_Any]) { _entities(representations: $r) { __typename } }",
+        variable_values={"r": _email_representations},
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"__typename": "User"}] * 2}
+    assert events == [
+        ("row", "a@email.com"),
+        ("key", "a@email.com"),
+        ("row", "b@email.com"),
+        ("key", "b@email.com"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_selection_is_passed_to_resolvers(raise_graphql):
+    selections = []
+
+    class Address(ObjectType):
+        city = String()
+        street = String()
+
+    @key("identifier")
+    class User(ObjectType):
+        identifier = graphene.ID()
+        email_field = String()
+        name = String()
+        address = graphene.Field(Address)
+
+        @classmethod
+        def __resolve_references(cls, info, key, values, selection):
+            selections.append(selection)
+            return {v: User(identifier=v, email_field=f"{v}@email.com") for v in values}
+
+    @key("id")
+    class File(ObjectType):
+        id = graphene.ID()
+        name = String()
+
+        def __resolve_reference(self, info, selection):
+            selections.append(selection)
+            return File(id=self.id, name=f"file_{self.id}")
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+        file = graphene.Field(File)
+
+    schema = build_schema(query=Query)
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any], $withAddress: Boolean!) {
+          _entities(representations: $representations) {
+            __typename
+            ... on User {
+              emailField
+              ...UserAddress @include(if: $withAddress)
+            }
+            ... on File {
+              name
+            }
+          }
+        }
+        fragment UserAddress on User { address { city } }
+        """,
+        variable_values={
+            "withAddress": True,
+            "representations": [
+                {"__typename": "User", "identifier": to_global_id("User", "1")},
+                {"__typename": "File", "id": to_global_id("File", "1")},
+                {"__typename": "File", "id": to_global_id("File", "2")},
+            ],
+        },
+    )
+    assert not result.errors
+    user_selection, *file_selections = selections
+    assert str(user_selection) == "emailField address { city }"
+    assert user_selection.attributes == {
+        "emailField": "email_field",
+        "address": "address",
+    }
+    assert len(file_selections) == 2
+    assert file_selections[0] is file_selections[1]
+    assert str(file_selections[0]) == "name"
+
+
+@pytest.mark.asyncio
+async def test_loader_merges_selections(raise_graphql):
+    selections = []
+
+    @key("email_field")
+    class User(ObjectType):
+        email_field = String()
+        name = String()
+        age = graphene.Int()
+
+        @classmethod
+        def _resolve_references(cls, info, key, values, selection):
+            selections.append(str(selection))
+            return [User(email_field=v, name=v, age=1) for v in values]
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+    context = Context(entity_loader=EntityLoader())
+
+    async def execute(field):
+        return await graphql(
+            schema.graphql_schema,
+            "query ($r: [_Any]) { _entities(representations: $r) { ... on User { %s } } }"
+            % field,
+            variable_values={"r": _email_representations},
+            context_value=context,
+        )
+
+    results = await asyncio.gather(execute("name"), execute("age"))
+    assert [result.errors for result in results] == [None, None]
+    assert selections == ["name age"]
+
+
+@pytest.mark.asyncio
+async def test_mixed_keys_are_resolved_concurrently(raise_graphql):
+    calls = []
+    email_resolved = asyncio.Event()
+
+    @key("email_field")
+    @key("identifier")
+    class User(ObjectType):
+        identifier = graphene.ID()
+        email_field = String()
+
+        @classmethod
+        async def __resolve_references(cls, info, key, values):
+            calls.append((key, values))
+            if key == "identifier":
+                # Only resolves if the email group runs concurrently
+                await asyncio.wait_for(email_resolved.wait(), 1)
+                return {
+                    v: User(identifier=v, email_field=f"{v}@email.com") for v in values
+                }
+            email_resolved.set()
+            return {v: User(identifier=v.split("@")[0], email_field=v) for v in values}
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              emailField
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "identifier": to_global_id("User", "1")},
+                {"__typename": "User", "emailField": "2@email.com"},
+                {"__typename": "User", "identifier": to_global_id("User", "3")},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [
+            {"emailField": "1@email.com"},
+            {"emailField": "2@email.com"},
+            {"emailField": "3@email.com"},
+        ]
+    }
+    assert sorted(calls) == [("email_field", ["2@email.com"]), ("identifier", [1, 3])]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_bulk_resolvers_read_their_representation(raise_graphql):
+    seen = []
+
+    @key("email_field")
+    class User(ObjectType):
+        email_field = String()
+
+        @classmethod
+        async def _resolve_reference_bulk(cls, model, info):
+            await asyncio.sleep(0)
+            seen.append(("User", info.context.representation))
+            info.context.user_resolved = True
+            return {v: User(email_field=v) for v in _get_email_values(info)}
+
+    @key("name")
+    class Team(ObjectType):
+        name = String()
+
+        @classmethod
+        async def _resolve_reference_bulk(cls, model, info):
+            seen.append(("Team", info.context.representation))
+            await asyncio.sleep(0)
+            (argument,) = info.field_nodes[0].arguments
+            return {v.value: Team(name=v.value) for v in argument.value.values}
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+        team = graphene.Field(Team)
+
+    schema = build_schema(query=Query)
+    context = Context()
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              emailField
+            }
+            ... on Team {
+              name
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "emailField": "a@email.com"},
+                {"__typename": "Team", "name": "core"},
+            ]
+        },
+        context_value=context,
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [{"emailField": "a@email.com"}, {"name": "core"}]
+    }
+    assert sorted(seen) == [("Team", "Team"), ("User", "User")]
+    # The other attributes are written to the request context
+    assert context.user_resolved
+    assert not hasattr(context, "representation")
+
+
+def test_sync_execution():
+    @key("identifier")
+    class User(ObjectType):
+        identifier = graphene.ID()
+        email_field = String()
+
+        def resolve_identifier(self, info):
+            return to_global_id(self.__class__.__name__, self.identifier)
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            return {v: User(identifier=v, email_field=f"{v}@email.com") for v in values}
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+    assert schema.graphql_schema.query_type.graphene_type._sync
+
+    result = schema.execute(
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              emailField
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "identifier": to_global_id("User", "1")},
+                {"__typename": "User", "identifier": to_global_id("User", "2")},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [{"emailField": "1@email.com"}, {"emailField": "2@email.com"}]
+    }
+
+
+@pytest.mark.asyncio
+async def test_sync_resolver_returning_awaitable(raise_graphql):
+    @key("email_field")
+    class User(ObjectType):
+        email_field = String()
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            async def fetch():
+                return [User(email_field=value) for value in values]
+
+            return fetch()
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+    assert schema.graphql_schema.query_type.graphene_type._sync
+
+    result = await graphql(
+        schema.graphql_schema,
+        _query.replace("id\n", ""),
+        variable_values={
+            "representations": [{"__typename": "User", "emailField": "1@email.com"}]
+        },
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"emailField": "1@email.com"}]}
+
+
+@pytest.mark.asyncio
+async def test_plain_row_entities(raise_graphql):
+    @dataclass
+    class UserRow:
+        email_field: str
+        name: str
+
+    ProductRow = namedtuple("ProductRow", ["sku", "name"])
+
+    @key("email_field")
+    class User(ObjectType):
+        email_field = String()
+        name = String()
+
+        class Meta:
+            possible_types = (UserRow,)
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            return [UserRow(email_field=v, name=v.split("@")[0]) for v in values]
+
+    @key("sku")
+    class Product(ObjectType):
+        sku = String()
+        name = String()
+
+        class Meta:
+            possible_types = (ProductRow,)
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            return [ProductRow(sku=v, name=f"product_{v}") for v in values]
+
+    @key("code")
+    class Country(ObjectType):
+        code = String()
+        name = String()
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            return [
+                {"__typename": "Country", "code": v, "name": v.upper()} for v in values
+            ]
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+        product = graphene.Field(Product)
+        country = graphene.Field(Country)
+
+    schema = build_schema(query=Query)
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              name
+            }
+            ... on Product {
+              name
+            }
+            ... on Country {
+              name
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "emailField": "1@email.com"},
+                {"__typename": "Product", "sku": "a"},
+                {"__typename": "Country", "code": "fr"},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [{"name": "1"}, {"name": "product_a"}, {"name": "FR"}]
+    }
+
+
+@pytest.mark.asyncio
+async def test_columnar_batch(raise_graphql):
+    views = []
+
+    @key("identifier")
+    class User(ObjectType):
+        identifier = graphene.ID()
+        email_field = String()
+        age = graphene.Int()
+        name = String()
+
+        def resolve_identifier(self, info):
+            return to_global_id(self.__class__.__name__, self.identifier)
+
+        def resolve_email_field(self, info):
+            views.append(self)
+            return self.email_field
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            # The rows in another order, with a missing one
+            return ColumnarBatch(
+                {
+                    "identifier": array("q", [3, 1]),
+                    "email_field": ["3@email.com", "1@email.com"],
+                    "age": array("q", [30, 10]),
+                }
+            )
+
+    class Query(ObjectType):
+        user = graphene.Field(User)
+
+    schema = build_schema(query=Query)
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              identifier
+              emailField
+              age
+              name
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "identifier": to_global_id("User", i)}
+                for i in (1, 2, 3)
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [
+            {
+                "identifier": to_global_id("User", 1),
+                "emailField": "1@email.com",
+                "age": 10,
+                "name": None,
+            },
+            None,
+            {
+                "identifier": to_global_id("User", 3),
+                "emailField": "3@email.com",
+                "age": 30,
+                "name": None,
+            },
+        ]
+    }
+    assert not hasattr(views[0], "__dict__")
+    assert repr(views[0]) == (
+        "User(identifier=1, email_field='1@email.com', age=10, name=None)"
+    )
@@ -0,0 +1,74 @@
+import pytest
+from graphene import Field, ID, ObjectType, String
+from graphql_relay import to_global_id
+
+from graphene_federation3 import build_schema, key
+from graphene_federation3.document_cache import DocumentCache
+
+ENTITIES_QUERY = """
+query ($representations: [_Any]) {
+  _entities(representations: $representations) {
+    ... on Product {
+      name
+    }
+  }
+}
+"""
+
+
+def get_schema():
+    @key("id")
+    class Product(ObjectType):
+        id = ID(required=True)
+        name = String()
+
+        def resolve_name(self, info):
+            return f"product_{self.id}"
+
+    class Query(ObjectType):
+        product = Field(Product)
+
+    return build_schema(query=Query)
+
+
+@pytest.mark.asyncio
+async def test_document_is_parsed_once():
+    cache = DocumentCache(get_schema())
+
+    for i in range(3):
+        result = await cache.execute(
+            ENTITIES_QUERY,
+            variables={
+                "representations": [
+                    {"__typename": "Product", "id": to_global_id("Product", i)}
+                ]
+            },
+        )
+        assert not result.errors
+        assert result.data == {"_entities": [{"name": f"product_{i}"}]}
+
+    assert (cache.misses, cache.hits) == (1, 2)
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_documents_are_not_cached():
+    cache = DocumentCache(get_schema())
+
+    result = await cache.execute("query { unknown }")
+    assert result.errors
+    result = await cache.execute("query {")
+    assert result.errors
+    assert len(cache) == 0
+
+
+def test_cache_is_bounded():
+    cache = DocumentCache(get_schema(), maxsize=2)
+
+    for query in ["{ __typename }", "{ _service { sdl } }", "{ product { name } }"]:
+        document, errors = cache.get(query)
+        assert document and not errors
+
+    assert len(cache) == 2
+    cache.get("{ __typename }")
+    assert cache.misses == 4
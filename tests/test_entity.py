@@ -7,6 +7,7 @@ from graphql_relay import to_global_id
 
 from graphene_federation3.entity import key
 from graphene_federation3.main import build_schema
+from graphene_federation3.utils import decode_global_ids
 
 
 @pytest.mark.asyncio
@@ -100,3 +101,72 @@ async def test_multiple_types():
             {"identifier": "VXNlcjoy"},
         ]
     }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("entity_stubs", [False, True])
+async def test_entity_without_resolver(entity_stubs):
+    entities = []
+
+    @key("identifier")
+    class User(ObjectType):
+        PREFIX = "user_"
+
+        identifier = ID()
+        email = String()
+        name = String()
+
+        def resolve_email(self, info):
+            entities.append(self)
+            return f"{self.get_name()}@email.com"
+
+        def get_name(self):
+            return f"{self.PREFIX}{self.identifier}"
+
+    class Query(ObjectType):
+        user = Field(User)
+
+    schema = build_schema(query=Query, entity_stubs=entity_stubs)
+    query = """
+    query ($representations: [_Any]) {
+      _entities(representations: $representations) {
+        ... on User {
+          email
+          name
+        }
+      }
+    }
+    """
+
+    result = await graphql(
+        schema.graphql_schema,
+        query,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "identifier": to_global_id("User", 1)}
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"email": "user_1@email.com", "name": None}]}
+
+    # Stubs are opt-in
+    (entity,) = entities
+    assert isinstance(entity, User) is not entity_stubs
+    if entity_stubs:
+        assert not hasattr(entity, "__dict__")
+        assert repr(entity) == "User(identifier=1, email=None, name=None)"
+
+
+def test_decode_global_ids():
+    global_ids = [
+        to_global_id("User", 10),
+        to_global_id("User", json.dumps("a")),
+        to_global_id("User", 0),
+    ]
+    assert decode_global_ids("User", global_ids) == [10, "a", 0]
+    assert decode_global_ids("User", []) == []
+
+    with pytest.raises(AssertionError) as err:
+        decode_global_ids("User", global_ids + [to_global_id("NotUser", 1)])
+    assert str(err.value) == "Invalid global id type: User != NotUser"
@@ -0,0 +1,230 @@
+import pytest
+from graphene import Field, ID, Int, List, NonNull, ObjectType, String
+from graphql_relay import to_global_id
+
+from graphene_federation3 import build_schema, key
+from graphene_federation3.executor import EntitiesExecutor
+
+ENTITIES_QUERY = """
+query ($representations: [_Any]) {
+  _entities(representations: $representations) {
+    __typename
+    ... on Product {
+      name
+      tags
+      price: cents(currency: "EUR")
+      details {
+        weight
+      }
+    }
+    ...ReviewFields
+  }
+}
+
+fragment ReviewFields on Review {
+  body
+}
+"""
+
+
+class Details(ObjectType):
+    weight = Int()
+
+
+def get_schema(calls):
+    @key("id")
+    class Product(ObjectType):
+        id = ID(required=True)
+        name = String(required=True)
+        tags = List(NonNull(String))
+        cents = Int(currency=String())
+        details = Field(Details)
+
+        def resolve_name(self, info):
+            calls.append(self.id)
+            if self.id == 0:
+                return None
+            return f"product_{self.id}"
+
+        def resolve_tags(self, info):
+            return ["a", "b"]
+
+        def resolve_cents(self, info, currency):
+            return 100 if currency == "EUR" else 0
+
+        async def resolve_details(self, info):
+            return Details(weight=self.id * 10)
+
+    @key("id")
+    class Review(ObjectType):
+        id = ID(required=True)
+        body = String()
+
+        def resolve_body(self, info):
+            return f"review_{self.id}"
+
+    class Query(ObjectType):
+        product = Field(Product)
+        review = Field(Review)
+
+    return build_schema(query=Query)
+
+
+@pytest.mark.asyncio
+async def test_compiled_entities():
+    calls = []
+    executor = EntitiesExecutor(get_schema(calls))
+
+    for i in range(1, 3):
+        result = await executor.execute(
+            ENTITIES_QUERY,
+            variables={
+                "representations": [
+                    {"__typename": "Product", "id": to_global_id("Product", i)},
+                    {"__typename": "Review", "id": to_global_id("Review", i)},
+                ]
+            },
+        )
+        assert not result.errors
+        assert result.data == {
+            "_entities": [
+                {
+                    "__typename": "Product",
+                    "name": f"product_{i}",
+                    "tags": ["a", "b"],
+                    "price": 100,
+                    "details": {"weight": i * 10},
+                },
+                {"__typename": "Review", "body": f"review_{i}"},
+            ]
+        }
+
+    (plan,) = executor._plans.values()
+    assert plan is not None
+    assert calls == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_compiled_entities_errors_fall_back_to_graphql():
+    calls = []
+    executor = EntitiesExecutor(get_schema(calls))
+
+    result = await executor.execute(
+        ENTITIES_QUERY,
+        variables={
+            "representations": [
+                {"__typename": "Product", "id": to_global_id("Product", 0)},
+                {"__typename": "Review", "id": to_global_id("Review", 1)},
+                {"__typename": "Product", "id": to_global_id("Product", 1)},
+                {"__typename": "Product", "id": to_global_id("Product", 2)},
+            ]
+        },
+    )
+    assert result.data["_entities"][:2] == [
+        None,
+        {"__typename": "Review", "body": "review_1"},
+    ]
+    assert result.data["_entities"][3]["details"] == {"weight": 20}
+    (error,) = result.errors
+    assert error.path == ["_entities", 0, "name"]
+    # The values resolved before falling back to graphql-core are reused
+    assert calls == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_compiled_entities_resolvers_are_called_once():
+    calls = []
+
+    @key("id")
+    class User(ObjectType):
+        id = ID(required=True)
+        name = String()
+        email = String()
+        tags = List(String)
+
+        def resolve_name(self, info):
+            calls.append(("name", self.id))
+            if self.id == 1:
+                raise ValueError("Unavailable")
+            return f"user_{self.id}"
+
+        async def resolve_email(self, info):
+            calls.append(("email", self.id))
+            if self.id == 2:
+                raise ValueError("No email")
+            return f"user_{self.id}@example.com"
+
+        def resolve_tags(self, info):
+            calls.append(("tags", self.id))
+            return (f"tag_{i}" for i in range(2))
+
+    class Query(ObjectType):
+        user = Field(User)
+
+    executor = EntitiesExecutor(build_schema(query=Query))
+    result = await executor.execute(
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              name
+              email
+              tags
+            }
+          }
+        }
+        """,
+        variables={
+            "representations": [
+                {"__typename": "User", "id": to_global_id("User", i)} for i in range(3)
+            ]
+        },
+    )
+    assert result.data == {
+        "_entities": [
+            {
+                "name": "user_0",
+                "email": "user_0@example.com",
+                "tags": ["tag_0", "tag_1"],
+            },
+            {"name": None, "email": "user_1@example.com", "tags": ["tag_0", "tag_1"]},
+            {"name": "user_2", "email": None, "tags": ["tag_0", "tag_1"]},
+        ]
+    }
+    assert sorted((error.message, error.path) for error in result.errors) == [
+        ("No email", ["_entities", 2, "email"]),
+        ("Unavailable", ["_entities", 1, "name"]),
+    ]
+    assert sorted(calls) == sorted(
+        (field, i) for field in ("name", "email", "tags") for i in range(3)
+    )
+
+
+@pytest.mark.asyncio
+async def test_not_compilable_operations():
+    executor = EntitiesExecutor(get_schema([]))
+
+    result = await executor.execute("{ _service { sdl } }")
+    assert not result.errors
+    assert "Product" in result.data["_service"]["sdl"]
+
+    result = await executor.execute(
+        """
+        query ($representations: [_Any], $skip: Boolean!) {
+          _entities(representations: $representations) {
+            ... on Review {
+              body @skip(if: $skip)
+            }
+          }
+        }
+        """,
+        variables={
+            "representations": [
+                {"__typename": "Review", "id": to_global_id("Review", 1)}
+            ],
+            "skip": True,
+        },
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{}]}
+    assert list(executor._plans.values()) == [None, None]
@@ -0,0 +1,83 @@
+import pytest
+from graphene import Field, ID, Int, ObjectType, String
+from graphql import graphql
+
+from graphene_federation3 import build_schema, extend, external, provides, requires
+
+
+def get_product_schema(fields):
+    class Dimensions(ObjectType):
+        height = external(Int())
+        width = external(Int())
+
+    @extend("sku")
+    class Product(ObjectType):
+        sku = external(ID())
+        total_weight = external(Int())
+        dimensions = external(Field(Dimensions))
+        shipping_estimate = requires(String(), fields=fields)
+
+    class Query(ObjectType):
+        product = Field(Product)
+
+    return build_schema(query=Query)
+
+
+@pytest.mark.asyncio
+async def test_requires_nested_field_set():
+    schema = get_product_schema("total_weight dimensions { height width }")
+
+    field_set = schema.field_sets["_requires"][("Product", "shippingEstimate")]
+    assert str(field_set) == "totalWeight dimensions { height width }"
+    assert field_set.attributes == {
+        "totalWeight": "total_weight",
+        "dimensions": "dimensions",
+    }
+    assert field_set.fields["dimensions"].type_name == "Dimensions"
+    assert field_set.fields["totalWeight"] is None
+
+    result = await graphql(schema.graphql_schema, "{ _service { sdl } }")
+    assert not result.errors
+    assert (
+        'shippingEstimate: String @requires(fields: "totalWeight dimensions { height width }")'
+        in result.data["_service"]["sdl"]
+    )
+
+
+@pytest.mark.parametrize(
+    "fields,message",
+    [
+        ("totalWeigth", 'Field "totalWeigth" does not exist on type "Product"'),
+        ("dimensions", 'Field "Product.dimensions" of type "Dimensions" must have'),
+        ("sku { id }", 'Field "Product.sku" of type "ID" can\'t have'),
+        ("dimensions { depth }", 'Field "depth" does not exist on type "Dimensions"'),
+        ("dimensions {", 'Invalid field set "dimensions {"'),
+    ],
+)
+def test_invalid_requires_field_set(fields, message):
+    with pytest.raises(ValueError) as err:
+        get_product_schema(fields)
+    assert 'Invalid @requires fields on "Product.shippingEstimate"' in str(err.value)
+    assert message in str(err.value)
+
+
+def test_invalid_provides_field_set():
+    @extend("sku")
+    class Product(ObjectType):
+        sku = external(String(required=True))
+        name = external(String())
+
+    @provides
+    class InStockCount(ObjectType):
+        product = provides(Field(Product, required=True), fields="name weight")
+        quantity = Int(required=True)
+
+    class Query(ObjectType):
+        in_stock_count = Field(InStockCount)
+
+    with pytest.raises(ValueError) as err:
+        build_schema(query=Query)
+    assert str(err.value) == (
+        'Invalid @provides fields on "InStockCount.product": '
+        'Field "weight" does not exist on type "Product"'
+    )
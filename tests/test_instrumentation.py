@@ -0,0 +1,75 @@
+import pytest
+from graphene import Field, Int, ObjectType, String
+from graphql import graphql
+
+from graphene_federation3 import EntityResolutionHooks, build_schema, key
+
+
+class RecordingHooks(EntityResolutionHooks):
+    def __init__(self):
+        self.events = []
+
+    def on_group_start(self, info, stats):
+        self.events.append(("start", stats.typename, stats.strategy))
+
+    def on_group_end(self, info, stats):
+        self.events.append(("end", stats.typename, stats.strategy))
+        self.stats = stats
+
+
+@pytest.mark.asyncio
+async def test_entity_hooks():
+    @key("id")
+    class Product(ObjectType):
+        id = Int(required=True)
+        name = String()
+
+        @classmethod
+        def __resolve_references(cls, info, key, values):
+            return {v: Product(id=v, name=f"product_{v}") for v in values if v != 3}
+
+    class Query(ObjectType):
+        product = Field(Product)
+
+    hooks = RecordingHooks()
+    schema = build_schema(query=Query, entity_hooks=[hooks])
+    query = """
+    query ($representations: [_Any]) {
+      _entities(representations: $representations) {
+        ... on Product {
+          name
+        }
+      }
+    }
+    """
+
+    result = await graphql(
+        schema.graphql_schema,
+        query,
+        variable_values={
+            "representations": [
+                {"__typename": "Product", "id": 1},
+                {"__typename": "Product", "id": 2},
+                {"__typename": "Product", "id": 1},
+                {"__typename": "Product", "id": 3},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [
+            {"name": "product_1"},
+            {"name": "product_2"},
+            {"name": "product_1"},
+            None,
+        ]
+    }
+    assert hooks.events == [
+        ("start", "Product", None),
+        ("end", "Product", "references"),
+    ]
+    assert hooks.stats.representations == 4
+    assert hooks.stats.key_count == 3
+    assert hooks.stats.misses == 1
+    assert hooks.stats.duration >= 0
+    assert hooks.stats.error is None
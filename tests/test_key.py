@@ -1,6 +1,9 @@
+import threading
+
 import pytest
 from graphene import Field, ID, ObjectType, String
 from graphql import graphql
+from graphql_relay import to_global_id
 
 from graphene_federation3.entity import key
 from graphene_federation3.main import build_schema
@@ -138,3 +141,243 @@ def test_compound_primary_keys_failure():
             organization = Field(Organization)
 
     assert "Compound primary keys are not supported." == str(err.value)
+
+
+@pytest.mark.asyncio
+async def test_cheapest_key_is_used():
+    calls = []
+
+    @key("id")
+    @key("email", cost=10)
+    class User(ObjectType):
+        id = ID(required=True)
+        email = String()
+
+        @classmethod
+        def _resolve_references(cls, info, key, values):
+            calls.append((key, values))
+            if key == "email":
+                return {v: User(id=f"id_{v}", email=v) for v in values}
+            return {v: User(id=v, email=f"{v}@email.com") for v in values}
+
+    class Query(ObjectType):
+        user = Field(User)
+
+    schema = build_schema(query=Query)
+    assert User._key_fields == ["id", "email"]
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              email
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {
+                    "__typename": "User",
+                    "id": to_global_id("User", 1),
+                    "email": "1@email.com",
+                },
+                {"__typename": "User", "email": "2@email.com"},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [{"email": "1@email.com"}, {"email": "2@email.com"}]
+    }
+    assert sorted(calls) == [("email", ["2@email.com"]), ("id", [1])]
+
+
+@pytest.mark.asyncio
+async def test_cheapest_key_is_used_by_reference_resolver():
+    @key("id", cost=10)
+    @key("email")
+    class User(ObjectType):
+        id = ID(required=True)
+        email = String()
+        name = String()
+
+        def __resolve_reference(self, info):
+            return User(id=self.id, email=self.email, name=f"user_{self.id}")
+
+    class Query(ObjectType):
+        user = Field(User)
+
+    schema = build_schema(query=Query)
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              name
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {
+                    "__typename": "User",
+                    "id": to_global_id("User", 1),
+                    "email": "1@email.com",
+                },
+                {
+                    "__typename": "User",
+                    "id": to_global_id("User", 2),
+                    "email": "2@email.com",
+                },
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"name": "user_1"}, {"name": "user_2"}]}
+
+
+@pytest.mark.asyncio
+async def test_blocking_reference_resolvers_run_concurrently():
+    # Only passes if the two blocking resolvers run at the same time
+    barrier = threading.Barrier(2, timeout=1)
+    threads = set()
+
+    @key("id", blocking=True)
+    class User(ObjectType):
+        id = ID(required=True)
+        email = String()
+
+        def __resolve_reference(self, info):
+            barrier.wait()
+            threads.add(threading.get_ident())
+            return User(id=self.id, email=f"{self.id}@email.com")
+
+    class Query(ObjectType):
+        user = Field(User)
+
+    schema = build_schema(query=Query)
+    assert not schema.graphql_schema.query_type.graphene_type._sync
+
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              email
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "id": to_global_id("User", i)} for i in (1, 2)
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [{"email": "1@email.com"}, {"email": "2@email.com"}]
+    }
+    assert len(threads) == 2 and threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_blocking_reference_resolver_returning_iterable_row():
+    @key("id", blocking=True)
+    class User(ObjectType):
+        id = ID(required=True)
+        email = String()
+
+        def __iter__(self):
+            # An iterable row, returned as it is by the per instance resolver
+            return iter([("id", self.id), ("email", self.email)])
+
+        def __resolve_reference(self, info):
+            return User(id=self.id, email=f"{self.id}@email.com")
+
+    class Query(ObjectType):
+        user = Field(User)
+
+    schema = build_schema(query=Query)
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              email
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [{"__typename": "User", "id": to_global_id("User", 1)}]
+        },
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"email": "1@email.com"}]}
+
+
+@pytest.mark.asyncio
+async def test_blocking_resolvers_schema_default():
+    threads = {}
+
+    @key("email")
+    class User(ObjectType):
+        email = String()
+
+        @classmethod
+        def _resolve_references(cls, info, key, values):
+            def iter_users():
+                # Lazily evaluated, like a query set
+                threads["User"] = threading.get_ident()
+                for value in values:
+                    yield User(email=value)
+
+            return iter_users()
+
+    @key("sku", blocking=False)
+    class Product(ObjectType):
+        sku = String()
+
+        @classmethod
+        def _resolve_references(cls, info, key, values):
+            threads["Product"] = threading.get_ident()
+            return {value: Product(sku=value) for value in values}
+
+    class Query(ObjectType):
+        user = Field(User)
+        product = Field(Product)
+
+    schema = build_schema(query=Query, blocking_resolvers=True)
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query ($representations: [_Any]) {
+          _entities(representations: $representations) {
+            ... on User {
+              email
+            }
+            ... on Product {
+              sku
+            }
+          }
+        }
+        """,
+        variable_values={
+            "representations": [
+                {"__typename": "User", "email": "1@email.com"},
+                {"__typename": "Product", "sku": "a"},
+            ]
+        },
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"email": "1@email.com"}, {"sku": "a"}]}
+    assert threads["User"] != threading.get_ident()
+    assert threads["Product"] == threading.get_ident()
@@ -0,0 +1,138 @@
+import pytest
+from graphene import Field, ID, Int, ObjectType, String
+from graphql import graphql
+from graphql_relay import to_global_id
+
+from graphene_federation3 import build_schema, key
+
+QUERY = """
+query ($representations: [_Any]) {
+  _entities(representations: $representations) {
+    ... on User {
+      id
+      email
+      fullName
+    }
+  }
+}
+"""
+
+
+def get_representations(*ids):
+    return [{"__typename": "User", "id": to_global_id("User", i)} for i in ids]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("is_async", [False, True])
+async def test_lazy_entities(is_async):
+    calls = []
+
+    def load_rows(key, values, fields):
+        calls.append((key, values, fields))
+        return {
+            value: {"email": f"{value}@email.com", "name": f"user_{value}", "age": 1}
+            for value in values
+            if value != 3
+        }
+
+    @key("id")
+    class User(ObjectType):
+        id = ID(required=True)
+        email = String()
+        name = String()
+        age = Int()
+        full_name = String()
+
+        FULL_NAME = "{} ({})"
+
+        def resolve_id(self, info):
+            return to_global_id("User", self.id)
+
+        def resolve_full_name(self, info):
+            return self.FULL_NAME.format(self.name, self.id)
+
+        if is_async:
+
+            @classmethod
+            async def __load_fields(cls, info, key, values, fields):
+                return load_rows(key, values, fields)
+
+        else:
+
+            @classmethod
+            def __load_fields(cls, info, key, values, fields):
+                return load_rows(key, values, fields)
+
+    class Query(ObjectType):
+        user = Field(User)
+
+    schema = build_schema(query=Query)
+    result = await graphql(
+        schema.graphql_schema,
+        QUERY.replace("fullName", "fullName\n      name"),
+        variable_values={"representations": get_representations(1, 2, 3, 1)},
+    )
+    assert not result.errors
+    assert result.data == {
+        "_entities": [
+            {
+                "id": to_global_id("User", 1),
+                "email": "1@email.com",
+                "fullName": "user_1 (1)",
+                "name": "user_1",
+            },
+            {
+                "id": to_global_id("User", 2),
+                "email": "2@email.com",
+                "fullName": "user_2 (2)",
+                "name": "user_2",
+            },
+            {
+                "id": to_global_id("User", 3),
+                "email": None,
+                "fullName": "None (3)",
+                "name": None,
+            },
+            {
+                "id": to_global_id("User", 1),
+                "email": "1@email.com",
+                "fullName": "user_1 (1)",
+                "name": "user_1",
+            },
+        ]
+    }
+    # A single load of the selected fields, the unselected `age` excluded
+    assert calls == [("id", [1, 2, 3], ["email", "full_name", "name"])]
+
+
+@pytest.mark.asyncio
+async def test_lazy_entities_key_only():
+    calls = []
+
+    @key("id")
+    class User(ObjectType):
+        id = ID(required=True)
+        email = String()
+
+        def resolve_id(self, info):
+            return to_global_id("User", self.id)
+
+        @classmethod
+        def _load_fields(cls, info, key, values, fields):
+            calls.append(fields)
+            return {}
+
+    class Query(ObjectType):
+        user = Field(User)
+
+    schema = build_schema(query=Query)
+    result = await graphql(
+        schema.graphql_schema,
+        "query ($representations: [_Any]) "
+        "{ _entities(representations: $representations) { ... on User { id } } }",
+        variable_values={"representations": get_representations(1)},
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"id": to_global_id("User", 1)}]}
+    # Only the key is selected: nothing to load
+    assert calls == []
@@ -0,0 +1,124 @@
+import pytest
+
+from graphene_federation3.asgi import create_app
+from graphene_federation3.document_cache import get_query_hash
+from graphene_federation3.persisted_queries import (
+    InMemoryPersistedQueryStore,
+    PersistedQueryStore,
+)
+
+from .test_asgi import ENTITIES_QUERY, call, get_schema, get_variables
+
+
+def persisted_query(query):
+    return {"persistedQuery": {"version": 1, "sha256Hash": get_query_hash(query)}}
+
+
+def test_in_memory_store_is_bounded():
+    store = InMemoryPersistedQueryStore(maxsize=2)
+    store.set("a", "{ a }")
+    store.set("b", "{ b }")
+    assert store.get("a") == "{ a }"
+    store.set("c", "{ c }")
+
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") == "{ a }"
+    assert store.get("c") == "{ c }"
+
+
+@pytest.mark.asyncio
+async def test_persisted_query_registration():
+    app = create_app(get_schema())
+    extensions = persisted_query(ENTITIES_QUERY)
+
+    status, _, response = await call(
+        app, body={"variables": get_variables(1), "extensions": extensions}
+    )
+    assert status == 200
+    assert response == {
+        "errors": [
+            {
+                "message": "PersistedQueryNotFound",
+                "extensions": {"code": "PERSISTED_QUERY_NOT_FOUND"},
+            }
+        ]
+    }
+
+    status, _, response = await call(
+        app,
+        body={
+            "query": ENTITIES_QUERY,
+            "variables": get_variables(1),
+            "extensions": extensions,
+        },
+    )
+    assert status == 200
+    assert response == {"data": {"_entities": [{"name": "product_0"}]}}
+
+    status, _, response = await call(
+        app, body={"variables": get_variables(2), "extensions": extensions}
+    )
+    assert status == 200
+    assert response == {
+        "data": {"_entities": [{"name": "product_0"}, {"name": "product_1"}]}
+    }
+
+
+@pytest.mark.asyncio
+async def test_persisted_query_hash_mismatch():
+    app = create_app(get_schema())
+
+    status, _, response = await call(
+        app,
+        body={"query": "{ __typename }", "extensions": persisted_query(ENTITIES_QUERY)},
+    )
+    assert status == 400
+    assert response == {
+        "errors": [{"message": "The provided sha256Hash does not match the query"}]
+    }
+    assert len(app.persisted_queries) == 0
+
+
+@pytest.mark.asyncio
+async def test_async_store():
+    class AsyncStore(PersistedQueryStore):
+        def __init__(self):
+            self.queries = {}
+
+        async def get(self, query_hash):
+            return self.queries.get(query_hash)
+
+        async def set(self, query_hash, query):
+            self.queries[query_hash] = query
+
+    store = AsyncStore()
+    app = create_app(get_schema(), persisted_queries=store)
+    query = "{ __typename }"
+
+    await call(app, body={"query": query, "extensions": persisted_query(query)})
+    assert store.queries == {get_query_hash(query): query}
+
+    status, _, response = await call(app, body={"extensions": persisted_query(query)})
+    assert status == 200
+    assert response == {"data": {"__typename": "Query"}}
+
+
+@pytest.mark.asyncio
+async def test_persisted_queries_disabled():
+    app = create_app(get_schema(), persisted_queries=False)
+
+    status, _, response = await call(
+        app, body={"extensions": persisted_query("{ __typename }")}
+    )
+    assert status == 400
+    assert response == {"errors": [{"message": "The operation query is missing"}]}
+
+
+def test_store_methods_are_abstract():
+    class IncompleteStore(PersistedQueryStore):
+        def get(self, query_hash):
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteStore()
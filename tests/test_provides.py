@@ -4,7 +4,7 @@ from graphql import graphql
 
 from graphene_federation3.extend import extend, external
 from graphene_federation3.main import build_schema
-from graphene_federation3.provides import provides
+from graphene_federation3.provides import get_provided_fields, provides
 
 PROVIDES_SCHEMA_2 = """schema {
   query: Query
@@ -401,3 +401,70 @@ async def test_provides_multiple_fields_as_list(
         actual=result.data["_service"]["sdl"].strip(),
         expected=LIST_RESPONSE_3,
     )
+
+
+@pytest.mark.asyncio
+async def test_provided_fields_at_runtime():
+    selections = []
+
+    class Dimensions(ObjectType):
+        height = external(Int())
+        width = external(Int())
+
+    @extend("sku")
+    class Product(ObjectType):
+        sku = external(String(required=True))
+        name = external(String())
+        weight = external(Int())
+        dimensions = external(Field(Dimensions))
+
+    @provides
+    class InStockCount(ObjectType):
+        product = provides(
+            Field(Product, required=True),
+            fields="name weight dimensions { height width }",
+        )
+        quantity = Int(required=True)
+
+        def resolve_product(self, info):
+            provided = get_provided_fields(info)
+            selections.append((str(provided.provided), str(provided.selected)))
+            return Product(sku="sku", name="name", dimensions=Dimensions(height=1))
+
+        def resolve_quantity(self, info):
+            assert get_provided_fields(info) is None
+            return 1
+
+    class Query(ObjectType):
+        in_stock_count = Field(InStockCount)
+
+        def resolve_in_stock_count(self, info):
+            return InStockCount()
+
+    schema = build_schema(query=Query)
+    result = await graphql(
+        schema.graphql_schema,
+        """
+        query {
+            inStockCount {
+                quantity
+                product {
+                    sku
+                    ...ProductName
+                    dimensions { height }
+                }
+            }
+        }
+        fragment ProductName on Product { name }
+        """,
+    )
+    assert not result.errors
+    assert result.data == {
+        "inStockCount": {
+            "quantity": 1,
+            "product": {"sku": "sku", "name": "name", "dimensions": {"height": 1}},
+        }
+    }
+    assert selections == [
+        ("name weight dimensions { height width }", "name dimensions { height }")
+    ]
@@ -0,0 +1,145 @@
+import json
+from io import StringIO
+
+import pytest
+from graphene import Field, ID, Int, List, ObjectType, String
+from graphql_relay import to_global_id
+
+from graphene_federation3 import build_schema, key
+from graphene_federation3.serializer import EntitiesSerializer
+
+ENTITIES_QUERY = """
+query ($representations: [_Any]) {
+  _entities(representations: $representations) {
+    __typename
+    ... on Product {
+      name
+      price
+      tags
+      available
+    }
+  }
+}
+"""
+
+
+def get_schema():
+    @key("id")
+    class Product(ObjectType):
+        id = ID(required=True)
+        name = String(required=True)
+        price = Int()
+        tags = List(String)
+        available = Field(lambda: Available)
+
+        def resolve_name(self, info):
+            return "product_é" if self.id else None
+
+        def resolve_price(self, info):
+            return self.id * 100
+
+        def resolve_tags(self, info):
+            return ["a", None]
+
+        def resolve_available(self, info):
+            return True
+
+    class Available(String):
+        @staticmethod
+        def serialize(value):
+            return "yes" if value else "no"
+
+    class Query(ObjectType):
+        product = Field(Product)
+
+    return build_schema(query=Query)
+
+
+def get_variables(*ids):
+    return {
+        "representations": [
+            {"__typename": "Product", "id": to_global_id("Product", i)} for i in ids
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_write_entities():
+    serializer = EntitiesSerializer(get_schema())
+    buffer = StringIO()
+
+    await serializer.write(buffer, ENTITIES_QUERY, variables=get_variables(1, 2))
+
+    assert json.loads(buffer.getvalue()) == {
+        "data": {
+            "_entities": [
+                {
+                    "__typename": "Product",
+                    "name": "product_é",
+                    "price": 100,
+                    "tags": ["a", None],
+                    "available": "yes",
+                },
+                {
+                    "__typename": "Product",
+                    "name": "product_é",
+                    "price": 200,
+                    "tags": ["a", None],
+                    "available": "yes",
+                },
+            ]
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_write_entities_errors():
+    serializer = EntitiesSerializer(get_schema())
+    buffer = StringIO()
+    buffer.write("prefix:")
+
+    await serializer.write(buffer, ENTITIES_QUERY, variables=get_variables(1, 0))
+
+    assert buffer.getvalue().startswith("prefix:")
+    response = json.loads(buffer.getvalue()[len("prefix:") :])
+    assert response["data"]["_entities"][1] is None
+    assert response["errors"][0]["path"] == ["_entities", 1, "name"]
+
+
+class Sink:
+    """
+    A non seekable text stream.
+    """
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+
+    def seekable(self):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_write_entities_errors_to_a_stream():
+    serializer = EntitiesSerializer(get_schema())
+    sink = Sink()
+
+    await serializer.write(sink, ENTITIES_QUERY, variables=get_variables(1, 0, 2))
+
+    # Written one entity at a time, the errors after the data
+    assert len(sink.writes) > 3
+    response = json.loads("".join(sink.writes))
+    assert list(response) == ["data", "errors"]
+    assert response["data"]["_entities"][1] is None
+    assert response["data"]["_entities"][2]["price"] == 200
+    assert [error["path"] for error in response["errors"]] == [["_entities", 1, "name"]]
+
+
+@pytest.mark.asyncio
+async def test_serialize_other_operations():
+    serializer = EntitiesSerializer(get_schema())
+
+    response = json.loads(await serializer.serialize("{ _service { sdl } }"))
+    assert "Product" in response["data"]["_service"]["sdl"]
@@ -0,0 +1,104 @@
+from base64 import b64decode
+
+import pytest
+from graphene import Field, ID, ObjectType, String
+from graphql import graphql
+from graphql_relay import to_global_id
+
+from graphene_federation3 import build_schema, key
+from graphene_federation3.tracing import FederatedTracingMiddleware, should_trace
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def decode_message(data):
+    """
+    Decode a protobuf message as a list of (field number, value) tuples.
+    """
+    fields = []
+    pos = 0
+    while pos < len(data):
+        tag, pos = read_varint(data, pos)
+        if tag & 7 == 2:
+            length, pos = read_varint(data, pos)
+            value, pos = data[pos : pos + length], pos + length
+        else:
+            value, pos = read_varint(data, pos)
+        fields.append((tag >> 3, value))
+    return fields
+
+
+def get_children(node):
+    return [decode_message(v) for k, v in node if k == 12]
+
+
+def test_should_trace():
+    assert should_trace({"apollo-federation-include-trace": "ftv1"})
+    assert not should_trace({})
+
+
+@pytest.mark.asyncio
+async def test_entities_trace():
+    @key("id")
+    class Product(ObjectType):
+        id = ID(required=True)
+        name = String()
+
+        def resolve_name(self, info):
+            return f"product_{self.id}"
+
+    class Query(ObjectType):
+        product = Field(Product)
+
+    schema = build_schema(query=Query)
+    query = """
+    query ($representations: [_Any]) {
+      _entities(representations: $representations) {
+        ... on Product {
+          title: name
+        }
+      }
+    }
+    """
+
+    tracer = FederatedTracingMiddleware()
+    result = await graphql(
+        schema.graphql_schema,
+        query,
+        variable_values={
+            "representations": [
+                {"__typename": "Product", "id": to_global_id("Product", 1)}
+            ]
+        },
+        middleware=[tracer],
+    )
+    assert not result.errors
+    assert result.data == {"_entities": [{"title": "product_1"}]}
+
+    tracer.add_to_result(result)
+    trace = dict(decode_message(b64decode(result.extensions["ftv1"])))
+    assert trace[11] > 0
+
+    (entities,) = get_children(decode_message(trace[14]))
+    entities_fields = dict(entities)
+    assert entities_fields[1] == b"_entities"
+    assert entities_fields[3] == b"[_Entity]"
+    assert entities_fields[9] >= entities_fields[8]
+
+    (item,) = get_children(entities)
+    assert dict(item)[2] == 0
+
+    (name,) = get_children(item)
+    name_fields = dict(name)
+    assert name_fields[1] == b"title"
+    assert name_fields[14] == b"name"
+    assert name_fields[13] == b"Product"